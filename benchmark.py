@@ -0,0 +1,37 @@
+import argparse
+import os
+import tempfile
+from datetime import datetime
+from utils.log import setup_logging
+from utils.benchmark import run_benchmark, log_results, save_results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the site build and FTP sync on a synthetic vault.")
+    parser.add_argument("--parashiyot", type=int, default=6, help="parashiyot per book (default: 6)")
+    parser.add_argument("--chapters", type=int, default=3, help="chapters per parasha (default: 3)")
+    parser.add_argument("--lines", type=int, default=20, help="lines per chapter (default: 20)")
+    parser.add_argument("--verses-per-line", type=int, default=3, help="verses per line (default: 3)")
+    parser.add_argument("--commentaries", type=int, default=10, help="perusim files per parasha (default: 10)")
+    parser.add_argument("--link-density", type=float, default=0.2,
+                        help="fraction of translation lines linking a commentary (default: 0.2)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the synthetic vault")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per phase; min and median are reported")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for the full builds")
+    parser.add_argument("--no-ftp", action="store_true", help="skip the FTP sync benchmark")
+    parser.add_argument("--ftp-latency", type=float, default=0.0,
+                        help="seconds the local FTP server waits before each command, to mimic a remote host")
+    parser.add_argument("--output", "-o",
+                        help="results file (default: .cache/benchmarks/benchmark-<time>.json)")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    output = args.output or os.path.join(".cache", "benchmarks", f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with tempfile.TemporaryDirectory(prefix="mytorah-bench-") as work_path:
+        results = run_benchmark(work_path, repeat=args.repeat, workers=args.jobs, ftp=not args.no_ftp,
+                                ftp_latency=args.ftp_latency, parashiyot=args.parashiyot, chapters=args.chapters,
+                                lines=args.lines, verses_per_line=args.verses_per_line,
+                                commentary_count=args.commentaries, link_density=args.link_density, seed=args.seed)
+
+    log_results(results)
+    save_results(results, output)
@@ -3,6 +3,14 @@
 VAULT_PATH = "/home/user/Documents/MyTorah"
 OUTPUT_PATH = "./site"
 FTP_HOST = ""
+FTP_PORT = 21
 FTP_USER = ""
 FTP_PASS = ""
 FTP_DIR = ""
+FTP_CONNECTIONS = 4
+# (source language, translation, output subfolder) of every site, e.g. add ("HE", "DE", "de")
+LANGUAGE_SITES = [("HE", "EN", ""), ("HE", "HU", "hu")]
+# Upper bound of the on-disk cache of rendered Markdown fragments (.cache/render.sqlite)
+RENDER_CACHE_MB = 64
+# Vault folders of parashiyot whose name ingest.py can't match to Sefaria's spelling
+PARASHA_FOLDERS = {"Beha'alotcha": "Behaalotcha"}
@@ -0,0 +1,32 @@
+import argparse
+from utils.log import setup_logging
+from utils.ingest import ingest, PARASHIYOT
+
+def source(spec):
+    """LANG:BOOK=FILE, or en:BOOK for the English translation from Sefaria."""
+    target, _, path = spec.partition("=")
+    lang, _, book = target.partition(":")
+    lang = lang.upper()
+    if book not in PARASHIYOT:
+        raise argparse.ArgumentTypeError(f"unknown book {book!r} (one of {', '.join(PARASHIYOT)})")
+    if lang not in ("HE", "HU", "EN") or (lang != "EN" and not path):
+        raise argparse.ArgumentTypeError(f"expected he:BOOK=FILE, hu:BOOK=FILE or en:BOOK, got {spec!r}")
+    return lang, book, path or None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import Torah source texts into the vault, one <parasha>/<LANG>.md per parasha.",
+                                     epilog="example: ingest.py he:Genesis=he.txt hu:Genesis=hu.txt en:Genesis")
+    parser.add_argument("sources", nargs="+", type=source, metavar="LANG:BOOK[=FILE]",
+                        help="a Hebrew (he.txt format) or Hungarian (hu.txt format) file of a whole book, "
+                             "or en:BOOK to download the English translation from Sefaria")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="books imported in parallel (default: 1)")
+    parser.add_argument("--force", action="store_true", help="overwrite files that already exist in the vault")
+    parser.add_argument("--quiet", "-q", action="store_true", help="only show warnings and errors")
+    parser.add_argument("--verbose", "-v", action="store_true", help="list every file written")
+    args = parser.parse_args()
+
+    setup_logging(args.quiet, args.verbose)
+    try:
+        ingest(args.sources, workers=args.jobs, force=args.force)
+    except ValueError as e:
+        parser.error(str(e))
@@ -99,9 +99,45 @@ function toggleLang(lang) {
     });
 }
 
+// 📌 Commentaries kept in a separate bundle (lazy commentary builds) are fetched on first use
+let commentaryBundle = null;
+
+function loadCommentaries() {
+    const holder = document.getElementById("commentary-bundle");
+    if (!commentaryBundle && holder) {
+        commentaryBundle = fetch(holder.dataset.src).then(r => r.json()).then(bundle => {
+            let html = "";
+            for (const [id, text] of bundle) {
+                html += `<div id="${id}" class="commentary">${text}</div><hr>`;
+            }
+            holder.outerHTML = html;
+        });
+    }
+    return commentaryBundle || Promise.resolve();
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+    // Links to a commentary (e.g. from search) need the bundle before they can scroll to it
+    const id = decodeURIComponent(location.hash.slice(1));
+    if (id && !document.getElementById(id) && document.getElementById("commentary-bundle")) {
+        loadCommentaries().then(() => highlightCommentary(id));
+    }
+});
+
 // 📌 Smooth scrolling and blinking effect for commentaries
 function highlightCommentary(commentaryId) {
     let commentary = document.getElementById(commentaryId);
+
+    if (!commentary && document.getElementById("commentary-bundle")) {
+        loadCommentaries().then(() => highlightCommentary(commentaryId));
+        return;
+    }
+
+    // Pages split into chapters link commentaries that live on another chapter's page
+    if (!commentary && window.chapterPages && chapterPages.commentaries[commentaryId]) {
+        location.href = chapterPages.commentaries[commentaryId] + "#" + encodeURIComponent(commentaryId);
+        return;
+    }
     
     if (commentary) {
         // Scroll smoothly to the selected commentary
@@ -116,3 +152,160 @@ function highlightCommentary(commentaryId) {
         }, 1500);
     }
 }
+
+// 🔎 Search: the index is sharded per book and only downloaded once the search box is used
+const searchShards = {};
+let searchIndex = null;
+
+function normalizeSearchText(text) {
+    // Same as utils/search.py: lowercase, no accents, niqqud or cantillation
+    return text.normalize("NFD").replace(/\p{Mn}/gu, "").toLowerCase();
+}
+
+function searchWords(text) {
+    return normalizeSearchText(text).match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+function loadSearchIndex(url) {
+    if (!searchIndex) {
+        searchIndex = fetch(url).then(r => r.json());
+    }
+    return searchIndex;
+}
+
+function loadSearchShard(base, file) {
+    if (!searchShards[file]) {
+        searchShards[file] = fetch(base + file).then(r => r.json()).then(shard => {
+            shard.words = Object.keys(shard.terms);
+            return shard;
+        });
+    }
+    return searchShards[file];
+}
+
+// Documents containing a word starting with prefix
+function searchShardPrefix(shard, prefix) {
+    const docs = new Set();
+    for (const word of shard.words) {
+        if (word.startsWith(prefix)) {
+            let doc = 0;
+            for (const delta of shard.terms[word]) {
+                doc += delta;
+                docs.add(doc);
+            }
+        }
+    }
+    return docs;
+}
+
+// Folder of the language site being browsed ("" for the root site)
+function currentSite() {
+    return location.pathname.split("/").slice(1, -1).map(decodeURIComponent).join("/");
+}
+
+// Parasha page being browsed; chapters of a split parasha (Parasha.33.html) count as the parasha
+function currentPage() {
+    return decodeURIComponent(location.pathname.split("/").pop()).replace(/\.\d+\.html$/, ".html");
+}
+
+function searchShard(shard, words) {
+    let docs = null;
+    for (const word of words) {
+        const found = searchShardPrefix(shard, word);
+        docs = docs ? new Set([...docs].filter(doc => found.has(doc))) : found;
+        if (!docs.size) break;
+    }
+    const site = currentSite();
+    return [...docs].sort((a, b) => a - b).map(doc => {
+        // [page, chapter, verse] for verses, [page, commentary id, sites] for commentaries
+        const [page, ...anchor] = shard.docs[doc];
+        const [file, title] = shard.pages[page];
+        if (typeof anchor[0] === "number") {
+            return { href: `${file}#ch${anchor[0]}-vrs${anchor[1]}`, text: `${title} ${anchor[0]}:${anchor[1]}` };
+        }
+        if (!anchor[1].includes(site)) return null;  // Not shown on this language site's page
+        return { href: `${file}#${encodeURIComponent(anchor[0])}`, text: `${title}: ${anchor[0]}` };
+    }).filter(Boolean);
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+    const form = document.getElementById("search");
+    const input = document.getElementById("search-input");
+    const list = document.getElementById("search-results");
+    if (!form || !input || !list) return;
+
+    const indexUrl = form.dataset.index;
+    const base = indexUrl.slice(0, indexUrl.lastIndexOf("/") + 1);
+    const maxResults = 50;
+    let query = 0;
+    let timer = null;
+    let allBooks = false;  // Other books' shards are only fetched once asked for
+
+    function show(results, moreBooks) {
+        list.innerHTML = "";
+        for (const result of results.slice(0, maxResults)) {
+            const item = document.createElement("li");
+            const link = document.createElement("a");
+            link.href = result.href;  // Relative, so it stays on the current language site
+            link.textContent = result.text;
+            item.appendChild(link);
+            list.appendChild(item);
+        }
+        if (moreBooks) {
+            const item = document.createElement("li");
+            const link = document.createElement("a");
+            link.href = "javascript:void(0);";
+            link.textContent = "Search all books…";
+            link.addEventListener("click", () => {
+                allBooks = true;
+                run();
+            });
+            item.appendChild(link);
+            list.appendChild(item);
+        }
+    }
+
+    function run() {
+        const current = ++query;
+        const words = searchWords(input.value);
+        if (!words.length) {
+            show([]);
+            return;
+        }
+
+        loadSearchIndex(indexUrl).then(index => {
+            const ownBook = index.shards.findIndex(entry => entry.pages.includes(currentPage()));
+            const perShard = index.shards.map(() => null);
+            const results = () => [].concat(...perShard.filter(Boolean));
+
+            function search(i) {
+                return loadSearchShard(base, index.shards[i].file).then(shard => {
+                    if (current !== query) return;
+                    perShard[i] = searchShard(shard, words);
+                    show(results(), !allBooks && perShard.includes(null));
+                });
+            }
+
+            if (allBooks) {
+                // Results appear in book order as each shard arrives
+                index.shards.forEach((entry, i) => search(i));
+            } else if (ownBook >= 0) {
+                search(ownBook);  // The book being read; other books' shards only when asked for
+            } else {
+                // A page of no book (e.g. the index): shards one by one until the list is full
+                const next = i => {
+                    if (i < index.shards.length && results().length < maxResults) {
+                        search(i).then(() => current === query && next(i + 1));
+                    }
+                };
+                next(0);
+            }
+        });
+    }
+
+    input.addEventListener("focus", () => loadSearchIndex(indexUrl), { once: true });
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(run, 150);
+    });
+});
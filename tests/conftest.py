@@ -0,0 +1,12 @@
+import os
+import sys
+import importlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import config  # noqa: F401  A local config.py, if there is one
+except ImportError:
+    # The modules read their settings from config.py, which isn't committed; the sample does for tests
+    sys.modules["config"] = importlib.import_module("config_sample")
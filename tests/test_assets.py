@@ -0,0 +1,31 @@
+import pytest
+
+from utils.assets import OutputWriter, TEMP_SUFFIX, remove_stale_output
+
+def test_page_is_replaced_only_when_complete(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("old page", encoding="utf-8")
+    with OutputWriter(str(page), precompress=True) as out:
+        out.write("<p>new")
+        assert page.read_text(encoding="utf-8") == "old page"  # Readers still see the previous page
+        out.write(" page</p>")
+    assert page.read_text(encoding="utf-8") == "<p>new page</p>"
+    assert (tmp_path / "page.html.gz").exists()
+    assert not list(tmp_path.glob("*" + TEMP_SUFFIX))
+
+def test_failed_render_keeps_the_previous_page(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("old page", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with OutputWriter(str(page)) as out:
+            out.write("<p>half a")
+            raise RuntimeError("template error")
+    assert page.read_text(encoding="utf-8") == "old page"
+    assert not list(tmp_path.glob("*" + TEMP_SUFFIX))
+
+def test_stale_output_goes_with_its_siblings(tmp_path):
+    for name in ["index.json", "index.json.gz", "old.json", "old.json.br", "gen/1.json", "gone/2.json.gz"]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text("x", encoding="utf-8")
+    remove_stale_output(str(tmp_path), {"index.json", "gen/1.json"}, precompress=False)
+    assert sorted(str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*")) == ["gen", "gen/1.json", "index.json"]
@@ -0,0 +1,232 @@
+import os
+import json
+import socket
+import logging
+import pytest
+from ftplib import error_perm
+
+from utils import ftp_upload, profiling
+from utils.benchmark import start_ftp_server, FTPHandler
+from utils.file_utils import file_hash
+
+pytestmark = pytest.mark.skipif(FTPHandler is None, reason="pyftpdlib is not installed")
+
+FILES = {f"page{i}.html": f"<p>page {i}</p>\n" * (i + 1) for i in range(8)}
+FILES.update({"hu/index.html": "<p>magyar</p>\n", "static/styles.css": "body { margin: 0; }\n"})
+FILES["index.html"] = "<p>index</p>\n"
+
+def write_site(root, files):
+    for rel_path, text in files.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+def read_remote(root, rel_path):
+    with open(os.path.join(root, rel_path), encoding="utf-8") as f:
+        return f.read()
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Local FTP server with a little latency per command, and ftp_upload pointed at it."""
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    port, stop = start_ftp_server(str(remote), latency=0.005)
+    monkeypatch.setattr(ftp_upload, "FTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(ftp_upload, "FTP_PORT", port)
+    monkeypatch.setattr(ftp_upload, "FTP_USER", "bench")
+    monkeypatch.setattr(ftp_upload, "FTP_PASS", "bench")
+    yield remote
+    stop()
+
+@pytest.fixture
+def site(tmp_path):
+    local = tmp_path / "site"
+    write_site(str(local), FILES)
+    return local
+
+@pytest.fixture
+def profile():
+    yield profiling.start_profile()
+    profiling.stop_profile()
+
+def make_remote_dirs(remote):
+    """upload_files() expects the directories to exist (sync_directory() creates them)."""
+    for rel_path in FILES:
+        os.makedirs(os.path.join(remote, os.path.dirname(rel_path)), exist_ok=True)
+
+def test_parallel_upload_uses_n_connections(server, site, profile, caplog):
+    make_remote_dirs(server)
+    caplog.set_level(logging.INFO, logger="utils.ftp_upload")
+    uploaded = ftp_upload.upload_files(str(site), "/", list(FILES), connections=3)
+
+    assert sorted(uploaded) == sorted(FILES)
+    for rel_path, text in FILES.items():
+        assert read_remote(server, rel_path) == text
+    assert profile.counts["ftp_connections"] == 3
+
+    # Summary of files and bytes
+    total = sum(len(text.encode("utf-8")) for text in FILES.values())
+    assert profile.counts["files_uploaded"] == len(FILES)
+    assert profile.counts["bytes_uploaded"] == total
+    assert f"📊 Uploaded {len(FILES)} files, {total / 1024:.1f} KB" in caplog.text
+    assert "over 3 connections (0 failed)" in caplog.text
+
+def test_dropped_session_is_retried_on_a_fresh_connection(server, site, profile, monkeypatch, caplog):
+    dropped = []
+
+    class DroppingFTP(ftp_upload.CountingFTP):
+        def storbinary(self, cmd, fp, *args, **kwargs):
+            if not dropped:
+                dropped.append(cmd)
+                self.sock.shutdown(socket.SHUT_RDWR)  # The server or a middlebox cut the session
+                raise ConnectionResetError("connection reset by peer")
+            return super().storbinary(cmd, fp, *args, **kwargs)
+
+    monkeypatch.setattr(ftp_upload, "CountingFTP", DroppingFTP)
+    make_remote_dirs(server)
+    uploaded = ftp_upload.upload_files(str(site), "/", list(FILES), connections=2)
+
+    assert sorted(uploaded) == sorted(FILES)
+    for rel_path, text in FILES.items():
+        assert read_remote(server, rel_path) == text
+    assert len(dropped) == 1
+    assert profile.counts["upload_retries"] == 1
+    assert profile.counts["ftp_connections"] == 3  # Two for the pool, one to replace the dropped session
+    assert profile.counts["files_failed"] == 0
+    assert "Connection problem" in caplog.text
+
+def test_sync_uploads_only_changed_files_in_parallel(server, site, caplog):
+    caplog.set_level(logging.INFO, logger="utils.ftp_upload")
+    ftp = ftp_upload.connect_ftp()
+    ftp_upload.sync_directory(ftp, str(site), "/", connections=2)
+    for rel_path, text in FILES.items():
+        assert read_remote(server, rel_path) == text
+
+    write_site(str(site), {"index.html": "<p>new index</p>\n"})
+    caplog.clear()
+    ftp_upload.sync_directory(ftp, str(site), "/", connections=2)
+    ftp.quit()
+    assert read_remote(server, "index.html") == "<p>new index</p>\n"
+    assert "✅ 1 changed files synced" in caplog.text
+
+@pytest.mark.parametrize("atomic", [False, True])
+def test_relative_ftp_dir(server, site, monkeypatch, atomic):
+    (server / "www").mkdir()
+    monkeypatch.setattr(ftp_upload, "FTP_DIR", "www")
+    monkeypatch.setattr(ftp_upload, "OUTPUT_PATH", str(site))
+
+    ftp_upload.upload_to_ftp(connections=2, atomic=atomic)
+    for rel_path, text in FILES.items():
+        assert read_remote(server / "www", rel_path) == text
+    assert (server / "www" / ftp_upload.SYNC_MANIFEST).exists()
+    assert not (server / "www" / "www").exists()
+
+    # A second deploy replaces the live files
+    write_site(str(site), {"index.html": "<p>new index</p>\n"})
+    ftp_upload.upload_to_ftp(connections=2, atomic=atomic)
+    assert read_remote(server / "www", "index.html") == "<p>new index</p>\n"
+    assert not [name for name in os.listdir(server / "www") if name.endswith(".part")]
+
+def test_reconnects_after_control_connection_timeout(server, site, monkeypatch):
+    ftp = ftp_upload.connect_ftp()
+    root = ftp_upload.remote_site_root(ftp, "/")
+    upload_files = ftp_upload.upload_files
+
+    def slow_upload(*args, **kwargs):
+        uploaded = upload_files(*args, **kwargs)
+        ftp.sock.shutdown(socket.SHUT_RDWR)  # The idle control connection timed out meanwhile
+        return uploaded
+
+    monkeypatch.setattr(ftp_upload, "upload_files", slow_upload)
+    ftp_upload.sync_directory(ftp, str(site), root, connections=2, atomic=True)
+    assert read_remote(server, "index.html") == FILES["index.html"]
+    assert (server / ftp_upload.SYNC_MANIFEST).exists()
+    assert ftp.sock is None  # Closed when it was replaced
+
+def test_files_dropped_from_the_site_are_removed_remotely(server, site):
+    ftp = ftp_upload.connect_ftp()
+    root = ftp_upload.remote_site_root(ftp, "/")
+    ftp_upload.sync_directory(ftp, str(site), root, connections=2)
+    assert (server / "static" / "styles.css").exists()
+
+    os.rename(site / "static" / "styles.css", site / "static" / "styles.1a2b3c4d.css")
+    (server / "unrelated.txt").write_text("not ours")
+    ftp_upload.sync_directory(ftp, str(site), root, connections=2)
+    ftp.quit()
+    assert not (server / "static" / "styles.css").exists()
+    assert read_remote(server, "static/styles.1a2b3c4d.css") == FILES["static/styles.css"]
+    assert (server / "unrelated.txt").exists()  # Never uploaded by a deploy, so left alone
+
+def test_partial_staged_upload_is_resumed(server, site, profile):
+    write_site(str(site), {"big.bin": "0123456789abcdef" * 4096})
+    make_remote_dirs(server)
+    size = os.path.getsize(site / "big.bin")
+    staged = {"big.bin": ftp_upload.staging_name("big.bin", file_hash(str(site / "big.bin")))}
+    ftp_upload.upload_files(str(site), "/", ["big.bin"], connections=1, staged=staged)
+
+    part = server / staged["big.bin"]
+    with open(part, "r+b") as f:
+        f.truncate(size // 3)  # The connection dropped a third of the way through
+    sent = profile.counts["bytes_uploaded"]
+    ftp_upload.upload_files(str(site), "/", ["big.bin"], connections=1, staged=staged)
+
+    assert profile.counts["bytes_uploaded"] - sent == size - size // 3
+    assert part.read_bytes() == (site / "big.bin").read_bytes()
+
+class RefusingFTP(ftp_upload.CountingFTP):
+    """Server that won't rename onto an existing file, optionally failing to move staged files at all."""
+    fail_staged = False
+
+    def rename(self, fromname, toname):
+        if self.fail_staged and fromname.endswith(".part"):
+            raise error_perm("550 Not allowed")
+        if ftp_upload.remote_file_size(self, toname) is not None:
+            raise error_perm("550 File exists")
+        return super().rename(fromname, toname)
+
+def stage(server, rel_path, text):
+    name = ftp_upload.staging_name(rel_path, "0" * 12)
+    (server / name).write_text(text, encoding="utf-8")
+    return name
+
+def test_swap_moves_the_live_file_aside_when_the_server_refuses_to_replace_it(server, monkeypatch):
+    monkeypatch.setattr(ftp_upload, "CountingFTP", RefusingFTP)
+    (server / "index.html").write_text("old", encoding="utf-8")
+    name = stage(server, "index.html", "new")
+    ftp = ftp_upload.connect_ftp()
+    ftp.voidcmd("TYPE I")
+    assert ftp_upload.swap_staged_files(ftp, "/", {"index.html": name}) == ["index.html"]
+    ftp.quit()
+    assert read_remote(server, "index.html") == "new"
+    assert sorted(os.listdir(server)) == ["index.html"]
+
+def test_failed_swap_keeps_the_live_file(server, monkeypatch):
+    monkeypatch.setattr(ftp_upload, "CountingFTP", RefusingFTP)
+    monkeypatch.setattr(RefusingFTP, "fail_staged", True)
+    (server / "index.html").write_text("old", encoding="utf-8")
+    name = stage(server, "index.html", "new")
+    ftp = ftp_upload.connect_ftp()
+    ftp.voidcmd("TYPE I")
+    assert ftp_upload.swap_staged_files(ftp, "/", {"index.html": name}) == []
+    ftp.quit()
+    assert read_remote(server, "index.html") == "old"
+    assert sorted(os.listdir(server)) == sorted(["index.html", name])
+
+def test_abandoned_staged_files_are_removed(server, site):
+    digest = file_hash(str(site / "page1.html"))
+    current = ftp_upload.staging_name("page1.html", digest)
+    outdated = ftp_upload.staging_name("index.html", "f" * 40)
+    (server / current).write_text(FILES["page1.html"][:5], encoding="utf-8")  # Resumed, not removed
+    (server / outdated).write_text("<p>an index that was never deployed</p>", encoding="utf-8")
+    (server / ftp_upload.STAGING_MANIFEST).write_text(
+        json.dumps({"page1.html": current, "index.html": outdated}), encoding="utf-8")
+
+    ftp = ftp_upload.connect_ftp()
+    ftp_upload.sync_directory(ftp, str(site), "/", connections=2, atomic=True)
+    ftp.quit()
+    for rel_path, text in FILES.items():
+        assert read_remote(server, rel_path) == text
+    leftovers = [name for _, _, names in os.walk(server) for name in names
+                 if name.endswith(".part") or name == ftp_upload.STAGING_MANIFEST]
+    assert not leftovers
@@ -0,0 +1,23 @@
+import os
+from types import SimpleNamespace
+
+from utils import preview
+from utils.preview import ChangeCollector
+
+def event(event_type, src_path, dest_path="", is_directory=False):
+    return SimpleNamespace(event_type=event_type, src_path=src_path, dest_path=dest_path, is_directory=is_directory)
+
+def test_only_source_changes_are_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview, "VAULT_PATH", str(tmp_path))
+    page = os.path.join(str(tmp_path), "1 Berésit", "Noách", "HE.md")
+    collector = ChangeCollector()
+    collector.dispatch(event("modified", os.path.dirname(page), is_directory=True))
+    collector.dispatch(event("closed", page))
+    collector.dispatch(event("modified", os.path.join(str(tmp_path), ".obsidian", "workspace.json")))
+    assert not collector.pending.is_set()
+
+    collector.dispatch(event("modified", os.path.join(str(tmp_path), ".obsidian", "bookmarks.json")))
+    collector.dispatch(event("moved", page, os.path.join(str(tmp_path), ".trash", "HE.md")))
+    assert collector.pending.is_set()
+    assert collector.take() == {os.path.join(str(tmp_path), ".obsidian", "bookmarks.json"), page}
+    assert not collector.pending.is_set() and collector.take() == set()
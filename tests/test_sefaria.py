@@ -0,0 +1,111 @@
+import os
+import json
+import shutil
+import pytest
+import requests
+
+from utils import sefaria, ingest
+from utils.sefaria import fetch_text, fetch_chapters, SefariaError
+from utils.ingest import EN_PARAMS
+
+# Sefaria API responses recorded in the on-disk cache format (see utils/sefaria.py), trimmed to a few verses
+RECORDED = os.path.join(os.path.dirname(__file__), "fixtures", "sefaria")
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class FakeSession:
+    """Stands in for the pooled requests session, answering every request with the given response."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, headers))
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setenv("SEFARIA_OFFLINE", "1")
+    monkeypatch.setattr(sefaria, "CACHE_PATH", RECORDED)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("offline mode went to the network")
+
+    monkeypatch.setattr(requests.Session, "request", no_network)
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A writable copy of the recorded cache, with the network answered by a FakeSession."""
+    path = tmp_path / "sefaria"
+    shutil.copytree(RECORDED, path)
+    monkeypatch.delenv("SEFARIA_OFFLINE", raising=False)
+    monkeypatch.setattr(sefaria, "CACHE_PATH", str(path))
+    return path
+
+def use_session(monkeypatch, response):
+    session = FakeSession(response)
+    monkeypatch.setattr(sefaria, "get_session", lambda pool_size=8: session)
+    return session
+
+def test_fetch_text_offline(offline):
+    data = fetch_text("Genesis.1", {"context": 0})
+    assert data["ref"] == "Genesis 1"
+    assert data["he"][0].startswith("בְּרֵאשִׁ֖ית")
+
+def test_fetch_chapters_offline_keeps_the_order(offline):
+    chapters = fetch_chapters("Genesis", [2, 1], EN_PARAMS)
+    assert [data["ref"] for data in chapters] == ["Genesis 2", "Genesis 1"]
+
+def test_offline_miss_raises(offline):
+    with pytest.raises(SefariaError):
+        fetch_text("Genesis.3", {"context": 0})
+
+def test_ingest_reads_sefaria_offline(offline, monkeypatch):
+    monkeypatch.setitem(ingest.CHAPTERS, "Genesis", 2)
+    verses = list(ingest.read_en("Genesis"))
+    assert [(chapter, verse) for chapter, verse, _ in verses] == [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (2, 3)]
+    assert verses[4][2].endswith("from doing any of the work.")  # Footnote removed
+    assert ingest.sefaria_breaks("Genesis") == {(2, 4)}
+
+def test_ingest_refuses_two_sources_for_a_language(tmp_path):
+    with pytest.raises(ValueError, match="he:Genesis given twice"):
+        ingest.ingest([("HE", "Genesis", "a.txt"), ("HE", "Genesis", "b.txt")], vault_path=str(tmp_path))
+
+def test_unchanged_text_is_revalidated(cache, monkeypatch):
+    session = use_session(monkeypatch, FakeResponse(304))
+    data = fetch_text("Genesis.1", {"context": 0})
+    assert data["ref"] == "Genesis 1"
+    (url, headers), = session.requests
+    assert url == sefaria.text_url("Genesis.1", {"context": 0})
+    assert headers["If-None-Match"] == 'W/"genesis-1-1"'
+    assert headers["If-Modified-Since"] == "Mon, 05 Aug 2024 10:00:00 GMT"
+
+def test_changed_text_replaces_the_cache_entry(cache, monkeypatch):
+    use_session(monkeypatch, FakeResponse(200, {"ref": "Genesis 1", "he": ["new"]}, {"ETag": '"v2"'}))
+    assert fetch_text("Genesis.1", {"context": 0})["he"] == ["new"]
+    with open(sefaria.cache_file(sefaria.text_url("Genesis.1", {"context": 0})), encoding="utf-8") as f:
+        entry = json.load(f)
+    assert entry["etag"] == '"v2"' and entry["data"]["he"] == ["new"]
+    assert not [name for name in os.listdir(cache) if name.endswith(".tmp")]
+
+def test_cached_copy_is_used_when_sefaria_is_unreachable(cache, monkeypatch):
+    use_session(monkeypatch, requests.ConnectionError("no route to host"))
+    assert fetch_text("Genesis.2", EN_PARAMS)["ref"] == "Genesis 2"
+    with pytest.raises(requests.ConnectionError):
+        fetch_text("Genesis.3", EN_PARAMS)
+
+def test_failed_request_without_cache_raises(cache, monkeypatch):
+    use_session(monkeypatch, FakeResponse(404))
+    with pytest.raises(SefariaError):
+        fetch_text("Genesis.51", EN_PARAMS)
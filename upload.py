@@ -1,7 +1,54 @@
+import argparse
+import os
+from utils.log import setup_logging
+from utils.profiling import profile_run, phase, default_report_path
 from utils.site_generator import generate_html
 from utils.ftp_upload import upload_to_ftp
 
 if __name__ == "__main__":
-    generate_html()
-    upload_to_ftp()
+    parser = argparse.ArgumentParser(description="Build the MyTorah site and upload it via FTP.")
+    parser.add_argument("--full", action="store_true",
+                        help="wipe the output folder and re-render every page")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes for page rendering (default: all cores)")
+    parser.add_argument("--shared-nav", action="store_true",
+                        help="serve the navigation as one cached nav.js instead of inlining it in every page")
+    parser.add_argument("--optimize-assets", action="store_true",
+                        help="minify and fingerprint static assets and precompress all output (.gz/.br)")
+    parser.add_argument("--search", action="store_true",
+                        help="add a search box backed by a prebuilt, per-book sharded search index")
+    parser.add_argument("--lazy-commentary", action="store_true",
+                        help="load each page's commentaries from a separate cached JSON file on first click")
+    parser.add_argument("--api", action="store_true",
+                        help="also export the text and commentaries as a static JSON API (api/), one file per chapter of each parasha")
+    parser.add_argument("--backlinks", action="store_true",
+                        help="end every commentary with links to the verses citing it, from any parasha")
+    parser.add_argument("--split-chapters", action="store_true",
+                        help="give every chapter its own page, prefetching the adjacent chapters")
+    parser.add_argument("--check-every-file", action="store_true",
+                        help="compare every remote file's size and date instead of using the sync manifest")
+    parser.add_argument("--atomic", action="store_true",
+                        help="upload changed files under staging names (resumable) and swap them in at the end")
+    parser.add_argument("--quiet", "-q", action="store_true", help="only show warnings and errors")
+    parser.add_argument("--verbose", "-v", action="store_true", help="also show every uploaded or skipped file")
+    parser.add_argument("--profile", nargs="?", const="", metavar="REPORT",
+                        help="write per-phase and per-page timings and counters as JSON "
+                             "(default: .cache/profiles/profile-<time>.json)")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="also dump cProfile stats of the run (pages are then rendered in-process)")
+    parser.add_argument("--top", type=int, default=10, help="slowest pages listed in the profile summary")
+    args = parser.parse_args()
 
+    setup_logging(args.quiet, args.verbose)
+    if args.cprofile:
+        args.jobs = 1  # cProfile only sees the main process
+    report = (args.profile or default_report_path()) if args.profile is not None else None
+
+    with profile_run(report, args.cprofile, args.top):
+        with phase("build"):
+            generate_html(incremental=not args.full, workers=args.jobs, shared_nav=args.shared_nav,
+                          optimize_assets=args.optimize_assets, search=args.search,
+                          lazy_commentary=args.lazy_commentary, api=args.api,
+                          backlinks=args.backlinks, split_chapters=args.split_chapters)
+        with phase("upload"):
+            upload_to_ftp(use_manifest=not args.check_every_file, atomic=args.atomic)
@@ -0,0 +1,99 @@
+import os
+import json
+import hashlib
+import logging
+from utils.assets import write_output_if_changed, remove_stale_output
+from utils.commentaries import load_commentary
+from utils.file_utils import strip_links
+
+logger = logging.getLogger(__name__)
+
+API_DIR = "api"  # Output subfolder shared by all language sites
+
+def dumps(data):
+    """Compact JSON with sorted keys, so unchanged data always gives the same bytes (and ETag)."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+def verse_text(markdown_text):
+    """A verse's Markdown with Obsidian and Markdown links reduced to their captions."""
+    return strip_links(markdown_text).strip()
+
+def parasha_chapters(book_corpus, parasha, commentary_index):
+    """{chapter: {verse: entry}} of a parasha from its compiled corpus and commentary index.
+
+    Each entry has the text of every language (Markdown without links) and the ids of
+    the commentaries linked from it that the parasha's pages show.
+    """
+    chapters = {}
+    for lang in book_corpus.manifest["languages"]:
+        if not book_corpus.has(parasha, lang):
+            continue
+        for chapter, verse, _, text, links in book_corpus.verses(parasha, lang):
+            entry = chapters.setdefault(chapter, {}).setdefault(verse, {"verse": verse, "text": {}, "commentaries": []})
+            if lang in entry["text"]:
+                logger.warning("⚠ %s %s:%s appears twice in %s, keeping the first", parasha, chapter, verse, lang)
+                continue
+            entry["text"][lang] = verse_text(text)
+            for cid in links:
+                if cid in commentary_index and cid not in entry["commentaries"]:
+                    entry["commentaries"].append(cid)
+    return chapters
+
+def referenced_from(references):
+    """A commentary's reverse index entries (see utils/backlinks.py) as one API record per citing verse."""
+    verses = {}
+    for book, parasha, chapter, verse, lang in references:
+        entry = verses.setdefault((book, parasha, chapter, verse), {
+            "book": book, "parasha": parasha, "chapter": chapter, "verse": verse, "languages": []})
+        entry["languages"].append(lang)
+    return list(verses.values())
+
+def write_api(output_path, books, precompress=False, references=None):
+    """Write the static JSON API: book → parasha → chapter files and each parasha's commentaries, plus index.json.
+
+    A chapter split between two parashiyot has a file in each, with that parasha's verses.
+    books lists (book, slug, book_corpus, [(parasha, parasha slug, commentary index), ...]).
+    Given the reverse index of references, each commentaries file also lists the verses citing them.
+    Files whose content didn't change keep their mtime, and files no longer produced are removed.
+    """
+    out_dir = os.path.join(output_path, API_DIR)
+    index = []
+    current = {"index.json"}
+    written = 0
+
+    def write(name, data):
+        nonlocal written
+        path = os.path.join(out_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        text = dumps(data)
+        if write_output_if_changed(path, text, precompress):
+            written += 1
+        current.add(name)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+    for book, slug, book_corpus, parashiyot in books:
+        entry = {"book": book, "slug": slug, "parashiyot": []}
+        for parasha, parasha_slug, commentary_index in parashiyot:
+            item = {"parasha": parasha, "slug": parasha_slug, "chapters": []}
+            chapters = parasha_chapters(book_corpus, parasha, commentary_index)
+            for chapter in sorted(chapters):
+                verses = [chapters[chapter][verse] for verse in sorted(chapters[chapter])]
+                name = f"{slug}/{parasha_slug}/{chapter}.json"
+                digest = write(name, {"book": book, "parasha": parasha, "chapter": chapter, "verses": verses})
+                item["chapters"].append({"chapter": chapter, "file": name, "verses": len(verses), "hash": digest})
+            if commentary_index:
+                bodies = {cid: load_commentary(path, mtime)[1] for cid, (path, mtime) in commentary_index.items()}
+                data = {"book": book, "parasha": parasha, "commentaries": bodies}
+                if references is not None:
+                    data["referenced_from"] = {cid: referenced_from(references[path])
+                                               for cid, (path, _) in commentary_index.items() if path in references}
+                item["commentaries"] = f"{slug}/{parasha_slug}/commentaries.json"
+                item["hash"] = write(item["commentaries"], data)
+            entry["parashiyot"].append(item)
+        index.append(entry)
+
+    write("index.json", {"books": index})
+
+    remove_stale_output(out_dir, current, precompress)
+
+    logger.info("🧩 JSON API written (%s files, %s changed).", len(current), written)
@@ -0,0 +1,210 @@
+import os
+import re
+import gzip
+import hashlib
+import logging
+
+try:
+    import brotli
+except ImportError:  # Optional: .br siblings are only written when brotli is installed
+    brotli = None
+
+COMPRESSIBLE = (".html", ".css", ".js", ".json")
+COMPRESSED_SUFFIXES = (".gz", ".br")
+TEMP_SUFFIX = ".tmp"  # Output files are written under this suffix and renamed into place when complete
+
+logger = logging.getLogger(__name__)
+
+def minify_css(text):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+def minify_js(text):
+    """Conservatively shrink a script: drop indentation, blank lines and whole-line // comments."""
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def write_if_changed(path, data):
+    """Write bytes to path unless it already holds exactly them (keeps mtimes of unchanged files)."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path + TEMP_SUFFIX, "wb") as f:
+        f.write(data)
+    os.replace(path + TEMP_SUFFIX, path)
+    return True
+
+def write_compressed_siblings(path, data):
+    """Write .gz (and .br if available) next to an output file, for servers that serve them directly."""
+    # mtime=0 keeps the .gz bytes stable, so unchanged pages don't look changed to the FTP sync
+    write_if_changed(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_if_changed(path + ".br", brotli.compress(data))
+
+class OutputWriter:
+    """Text writer for generated files that can be fed piece by piece.
+
+    The pieces go to temporary files that replace the file (and its siblings) when the
+    writer is closed, so a reader such as the preview server never sees a half-written
+    page, and a render that fails leaves the previous one in place. With precompress,
+    every piece also goes through gzip (and brotli) compressors writing the .gz/.br
+    siblings, so the output never has to be joined into one big string.
+    """
+
+    def __init__(self, path, precompress=False):
+        self.path = path
+        self.targets = [path] if path != os.devnull else []  # The benchmark renders to os.devnull
+        self.file = open(path + TEMP_SUFFIX if self.targets else path, "wb")
+        self.gzip = self.gzip_file = self.brotli = self.brotli_file = None
+        self.precompress = precompress and path.endswith(COMPRESSIBLE)
+        if self.precompress:
+            # mtime=0 and no file name keep the .gz bytes stable between builds
+            self.gzip_file = open(path + ".gz" + TEMP_SUFFIX, "wb")
+            self.gzip = gzip.GzipFile(filename="", mode="wb", compresslevel=9,
+                                      fileobj=self.gzip_file, mtime=0)
+            self.targets.append(path + ".gz")
+            if brotli is not None:
+                self.brotli = brotli.Compressor()
+                self.brotli_file = open(path + ".br" + TEMP_SUFFIX, "wb")
+                self.targets.append(path + ".br")
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.file.write(data)
+        if self.gzip:
+            self.gzip.write(data)
+        if self.brotli:
+            self.brotli_file.write(self.brotli.process(data))
+
+    def close(self):
+        """Finish the files and move them into place."""
+        self.file.close()
+        if self.gzip:
+            self.gzip.close()
+            self.gzip_file.close()
+        if self.brotli:
+            self.brotli_file.write(self.brotli.finish())
+            self.brotli_file.close()
+        for target in self.targets:
+            os.replace(target + TEMP_SUFFIX, target)
+        if not self.precompress:
+            remove_output(self.path, siblings_only=True)  # Left over from an earlier precompressed build
+
+    def discard(self):
+        """Drop what was written, leaving the previous files alone."""
+        for file in (self.file, self.gzip_file, self.brotli_file):
+            if file:
+                file.close()
+        for target in self.targets:
+            if os.path.exists(target + TEMP_SUFFIX):
+                os.remove(target + TEMP_SUFFIX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+def write_output(path, text, precompress=False):
+    """Write a generated text file, plus its precompressed siblings if requested."""
+    with OutputWriter(path, precompress) as out:
+        out.write(text)
+
+def write_output_if_changed(path, text, precompress=False):
+    """Like write_output, but leaves a file whose content is unchanged (and its mtime) alone."""
+    data = text.encode("utf-8")
+    changed = write_if_changed(path, data)
+    if precompress and path.endswith(COMPRESSIBLE):
+        write_compressed_siblings(path, data)
+    else:
+        remove_output(path, siblings_only=True)
+    return changed
+
+def remove_output(path, siblings_only=False):
+    """Remove a generated file together with its precompressed siblings."""
+    candidates = tuple(path + suffix for suffix in COMPRESSED_SUFFIXES)
+    if not siblings_only:
+        candidates = (path,) + candidates
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+def remove_stale_output(out_dir, current, precompress=True):
+    """Remove the files under out_dir that aren't in current, with their .gz/.br siblings.
+
+    current holds paths relative to out_dir with "/" separators. Without precompress the
+    siblings of current files go as well. Folders left empty are removed.
+    """
+    for dirpath, dirnames, filenames in os.walk(out_dir, topdown=False):
+        for item in filenames:
+            base = item
+            for suffix in COMPRESSED_SUFFIXES:
+                if base.endswith(suffix):
+                    base = base[:-len(suffix)]
+            path = os.path.join(dirpath, base)
+            if os.path.relpath(path, out_dir).replace(os.sep, "/") not in current:
+                remove_output(path)
+            elif item != base and not precompress:
+                remove_output(path, siblings_only=True)
+        if dirpath != out_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+def build_static_assets(static_src, static_dst):
+    """Minify, fingerprint and precompress the static folder into static_dst.
+
+    Every asset is written as name.<hash>.ext so it can be cached forever; assets
+    whose content didn't change are left alone, and old fingerprints are removed.
+    Returns the mapping of original names to fingerprinted names.
+    """
+    os.makedirs(static_dst, exist_ok=True)
+    assets = {}
+    written = 0
+
+    for item in sorted(os.listdir(static_src)):
+        src = os.path.join(static_src, item)
+        if not os.path.isfile(src):
+            continue
+
+        if item.endswith(".css"):
+            with open(src, "r", encoding="utf-8") as f:
+                data = minify_css(f.read()).encode("utf-8")
+        elif item.endswith(".js"):
+            with open(src, "r", encoding="utf-8") as f:
+                data = minify_js(f.read()).encode("utf-8")
+        else:
+            with open(src, "rb") as f:
+                data = f.read()
+
+        stem, ext = os.path.splitext(item)
+        digest = hashlib.sha1(data).hexdigest()[:8]  # Of the minified bytes actually served
+        assets[item] = f"{stem}.{digest}{ext}"
+        dst = os.path.join(static_dst, assets[item])
+        if write_if_changed(dst, data):
+            written += 1
+        if item.endswith(COMPRESSIBLE):
+            write_compressed_siblings(dst, data)
+
+    # Drop fingerprints (and plain copies) that no current asset uses
+    remove_stale_output(static_dst, set(assets.values()))
+
+    logger.info("✅ Static assets built (%s changed, %s unchanged).", written, len(assets) - written)
+    return assets
+
+def rewrite_asset_urls(html, assets):
+    """Point /static/<name> references in a template at the fingerprinted files."""
+    return re.sub(r"/static/([\w.-]+)",
+                  lambda m: "/static/" + assets.get(m.group(1), m.group(1)),
+                  html)
@@ -0,0 +1,59 @@
+import os
+import logging
+from utils.commentaries import scan_commentaries, unique_commentaries, resolve_links
+from utils.corpus import open_book, list_parashiyot
+
+logger = logging.getLogger(__name__)
+
+def scan_vault_commentaries(vault_path, books, commentary_indexes):
+    """Scan every parasha's perusim/ folder missing from commentary_indexes into it.
+
+    Returns the commentaries whose id is unique in the vault (see unique_commentaries),
+    which links that their own parasha has no commentary for resolve to.
+    """
+    for book, parashiyot in books.items():
+        for parasha in list_parashiyot(vault_path, book, parashiyot):
+            parasha_path = os.path.join(vault_path, book, parasha)
+            if parasha_path not in commentary_indexes:
+                commentary_indexes[parasha_path] = scan_commentaries(parasha_path)
+    return unique_commentaries(commentary_indexes)
+
+def build_reference_index(vault_path, books, commentary_indexes):
+    """Map every perusim file to the verses linking to it, in one pass over the compiled corpus.
+
+    A link resolves like the pages render it (see resolve_links): to the parasha's own
+    perusim/ first and otherwise to the only commentary of that name in the vault, so
+    cross-parasha references are found too. Returns {commentary path: [(book, parasha,
+    chapter, verse, language), ...]} in vault order. Parashiyot missing from
+    commentary_indexes are scanned into it.
+    """
+    unique = scan_vault_commentaries(vault_path, books, commentary_indexes)
+
+    references = {}
+    for book, parashiyot in books.items():
+        book_corpus = open_book(vault_path, book)
+        for parasha in list_parashiyot(vault_path, book, parashiyot):
+            own = commentary_indexes[os.path.join(vault_path, book, parasha)]
+            languages = [lang for lang in book_corpus.manifest["languages"] if book_corpus.has(parasha, lang)]
+            linked, _ = resolve_links(own, book_corpus.link_ids(parasha, *languages), unique)
+            for lang in languages:
+                for chapter, verse, _, _, links in book_corpus.verses(parasha, lang):
+                    for cid in links:
+                        if cid not in linked:
+                            continue  # Missing or ambiguous, reported by the build
+                        found = references.setdefault(linked[cid][0], [])
+                        reference = (book, parasha, chapter, verse, lang)
+                        if reference not in found:
+                            found.append(reference)
+
+    shared = sum(len({ref[:4] for ref in refs}) > 1 for refs in references.values())
+    logger.info("🔗 Reverse index: %s commentaries linked, %s of them from several verses.", len(references), shared)
+    return references
+
+def verse_references(references, languages=None):
+    """(book, parasha, chapter, verse) of references, once each, optionally only those from the given languages."""
+    verses = []
+    for book, parasha, chapter, verse, lang in references:
+        if (languages is None or lang in languages) and (book, parasha, chapter, verse) not in verses:
+            verses.append((book, parasha, chapter, verse))
+    return verses
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import logging
+import random
+import shutil
+import platform
+import statistics
+import subprocess
+import threading
+import multiprocessing
+from datetime import datetime, timezone
+
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+except ImportError:  # Optional: the FTP sync is only benchmarked when pyftpdlib is installed
+    FTPHandler = None
+
+from utils import site_generator, ftp_upload, commentaries, render_cache, corpus
+from utils.site_generator import (SEFARIA_BOOK_MAP, LANGUAGE_SITES, BuildContext, plan_pages, load_parasha_source,
+                                  render_parasha_page, generate_html)
+from utils.commentaries import load_commentary
+
+BOOKS = list(SEFARIA_BOOK_MAP)  # Same five books as the real vault
+HEBREW_LETTERS = "אבגדהוזחטיכלמנסעפצקרשת"
+HEBREW_MARKS = "ְִַָּ֑֖֥"  # Niqqud and cantillation
+logger = logging.getLogger(__name__)
+
+LATIN_WORDS = ("and", "the", "said", "unto", "land", "people", "house", "és", "mondta", "népet", "földjére", "Ézsau")
+
+def hebrew_word(rng):
+    """Random pointed Hebrew word."""
+    return "".join(rng.choice(HEBREW_LETTERS) + rng.choice(HEBREW_MARKS) for _ in range(rng.randint(2, 5)))
+
+def latin_words(rng, count):
+    """Random English/Hungarian filler text."""
+    return " ".join(rng.choice(LATIN_WORDS) for _ in range(count))
+
+def generate_vault(path, parashiyot=6, chapters=3, lines=20, verses_per_line=3, commentary_count=10,
+                   link_density=0.2, seed=1):
+    """Write a synthetic vault with the real layout: <book>/<parasha>/{HE,EN,HU}.md, perusim/ and bookmarks.json.
+
+    Every book gets `parashiyot` parashiyot of `chapters` chapters with `lines` lines of
+    `verses_per_line` verses each. `commentary_count` perusim files exist per parasha and
+    a `link_density` fraction of the translation lines links one of them.
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    sortspec = []
+    for book_number, book in enumerate(BOOKS):
+        names = [f"Párasá {book_number + 1}-{number + 1}" for number in range(parashiyot)]
+        sortspec.append({"title": book, "items": [{"title": name} for name in reversed(names)]})
+
+        for name in names:
+            parasha_path = os.path.join(path, book, name)
+            os.makedirs(os.path.join(parasha_path, "perusim"))
+            he, en, hu = ["---", "cssclasses: he", "---"], [], []
+
+            for chapter in range(1, chapters + 1):
+                he.append(f"# {HEBREW_LETTERS[chapter % len(HEBREW_LETTERS)]}")
+                en.append(f"# Chapter {chapter}")
+                hu.append(f"# {chapter}. fejezet")
+                verse = 1
+                for _ in range(lines):
+                    he_line, en_line, hu_line = [], [], []
+                    for _ in range(verses_per_line):
+                        he_line.append(f"**{{{HEBREW_LETTERS[verse % len(HEBREW_LETTERS)]}}}** " +
+                                       " ".join(hebrew_word(rng) for _ in range(rng.randint(5, 12))))
+                        en_line.append(f"**{verse}.** {latin_words(rng, rng.randint(8, 20))}")
+                        hu_line.append(f"**{verse}.** {latin_words(rng, rng.randint(8, 20))}")
+                        verse += 1
+                    if commentary_count and rng.random() < link_density:
+                        cid = f"c{rng.randrange(commentary_count)}"
+                        en_line.append(f"[[{cid}|note]]")
+                        hu_line.append(f"[[{cid}]]")
+                    he.append(" ".join(he_line))
+                    en.append(" ".join(en_line))
+                    hu.append(" ".join(hu_line))
+
+            for lang, text in (("HE", he), ("EN", en), ("HU", hu)):
+                with open(os.path.join(parasha_path, f"{lang}.md"), "w", encoding="utf-8") as f:
+                    f.write("\n".join(text))
+            for number in range(commentary_count):
+                with open(os.path.join(parasha_path, "perusim", f"c{number}.md"), "w", encoding="utf-8") as f:
+                    f.write(f"**Commentary {number}** on {name}\n{latin_words(rng, 40)}\n"
+                            f"See [[c{(number + 1) % commentary_count}|the next one]].")
+
+    os.makedirs(os.path.join(path, ".obsidian"))
+    with open(os.path.join(path, ".obsidian", "bookmarks.json"), "w", encoding="utf-8") as f:
+        json.dump({"items": [{"title": "sortspec", "items": sortspec}]}, f, ensure_ascii=False)
+
+def use_paths(vault_path, output_path):
+    """Point the generator and the uploader at the synthetic vault and output folder."""
+    site_generator.VAULT_PATH = vault_path
+    site_generator.OUTPUT_PATH = output_path
+    ftp_upload.OUTPUT_PATH = output_path
+    work_path = os.path.dirname(os.path.abspath(output_path))
+    render_cache.use(os.path.join(work_path, "render.sqlite"))
+    corpus.CORPUS_PATH = os.path.join(work_path, "corpus")
+
+def start_ftp_server(root, latency=0.0):
+    """Local FTP stand-in on a free port; latency (seconds) is added to every command.
+
+    Returns (port, stop function).
+    """
+    class SlowHandler(FTPHandler):
+        def pre_process_command(self, line, cmd, arg):
+            if latency:
+                time.sleep(latency)
+            return super().pre_process_command(line, cmd, arg)
+
+    # With a handler in place pyftpdlib doesn't set up its own per-command logging
+    logger = logging.getLogger("pyftpdlib")
+    logger.setLevel(logging.WARNING)
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    authorizer = DummyAuthorizer()
+    authorizer.add_user("bench", "bench", root, perm="elradfmwMT")
+    SlowHandler.authorizer = authorizer
+    server = ThreadedFTPServer(("127.0.0.1", 0), SlowHandler)
+    running = threading.Event()
+    running.set()
+
+    def serve():
+        while running.is_set():
+            server.serve_forever(timeout=0.01, blocking=False, handle_exit=False)
+        server.close_all()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+
+    def stop():
+        running.clear()
+        thread.join()
+
+    return server.socket.getsockname()[1], stop
+
+def timed(phases, name, function):
+    """Run function once with logging switched off and record its wall time under name."""
+    logging.disable(logging.CRITICAL)
+    try:
+        start = time.perf_counter()
+        result = function()
+        phases.setdefault(name, []).append(time.perf_counter() - start)
+    finally:
+        logging.disable(logging.NOTSET)
+    return result
+
+def touch_commentary(vault_path):
+    """Edit one commentary, so an incremental build has exactly one parasha to re-render."""
+    book = sorted(name for name in os.listdir(vault_path) if not name.startswith("."))[0]
+    parasha = sorted(os.listdir(os.path.join(vault_path, book)))[0]
+    with open(os.path.join(vault_path, book, parasha, "perusim", "c0.md"), "a", encoding="utf-8") as f:
+        f.write(" edited")
+
+def benchmark_phases(phases, vault_path, output_path):
+    """Time the build phases separately: nav, corpus compilation, planning, Markdown, commentaries,
+    page rendering, and the rendering split into template assembly (written to /dev/null) and file writes.
+    """
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    if os.path.exists(corpus.CORPUS_PATH):
+        shutil.rmtree(corpus.CORPUS_PATH)
+    commentaries._loaded.clear()
+    render_cache.clear()  # Markdown and commentaries are timed with a cold render cache
+
+    context = timed(phases, "nav", BuildContext)
+    timed(phases, "corpus", lambda: corpus.compile_books(vault_path, context.books, LANGUAGE_SITES))
+    commentary_indexes = {}
+    jobs, _, _ = timed(phases, "plan", lambda: plan_pages({}, {}, commentary_indexes, context))
+
+    def parse_sources():
+        sources = {}
+        for book, parasha, parasha_path, _, _, pages in jobs:
+            book_corpus = corpus.open_book(vault_path, book)
+            languages = {lang for _, lang1, lang2, _, _ in pages for lang in (lang1, lang2)}
+            sources[parasha_path] = {lang: load_parasha_source(book_corpus, parasha, lang) for lang in languages}
+        return sources
+    sources = timed(phases, "markdown", parse_sources)
+
+    def load_commentaries():
+        for index in commentary_indexes.values():
+            for path, mtime in index.values():
+                load_commentary(path, mtime)
+    timed(phases, "commentaries", load_commentaries)
+
+    def render(to_disk):
+        for book, parasha, parasha_path, commentary_index, _, pages in jobs:
+            anchored = {}
+            for _, lang1, lang2, out_file, inputs in pages:
+                render_parasha_page(lang1, lang2, book, parasha, parasha_path, commentary_index,
+                                    out_file if to_disk else os.devnull, context, inputs,
+                                    sources[parasha_path], anchored)
+    timed(phases, "render", lambda: render(True))
+    timed(phases, "template", lambda: render(False))
+
+    pages = {}
+    for job in jobs:
+        for _, _, _, out_file, _ in job[5]:
+            with open(out_file, "rb") as f:
+                pages[out_file] = f.read()
+
+    def write_pages():
+        for out_file, data in pages.items():
+            with open(out_file, "wb") as f:
+                f.write(data)
+    timed(phases, "write", write_pages)
+
+def benchmark_builds(phases, vault_path, output_path, workers):
+    """Time whole builds: full (with a cold and a warm render cache), incremental without
+    changes and incremental after one edit.
+    """
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    if os.path.exists(corpus.CORPUS_PATH):
+        shutil.rmtree(corpus.CORPUS_PATH)
+    commentaries._loaded.clear()
+    render_cache.clear()
+    timed(phases, "build_full", lambda: generate_html(workers=workers))
+    commentaries._loaded.clear()
+    timed(phases, "build_full_cached", lambda: generate_html(workers=workers))
+    timed(phases, "build_noop", lambda: generate_html(incremental=True, workers=workers))
+    touch_commentary(vault_path)
+    timed(phases, "build_one_change", lambda: generate_html(incremental=True, workers=workers))
+
+def benchmark_ftp(phases, vault_path, output_path, ftp_root, latency=0.0, connections=None):
+    """Time FTP syncs of the built site against a local server: full upload, no-op and one changed parasha."""
+    if FTPHandler is None:
+        logger.warning("⚠ pyftpdlib is not installed, skipping the FTP benchmark.")
+        return
+    if os.path.exists(ftp_root):
+        shutil.rmtree(ftp_root)
+    os.makedirs(ftp_root)  # The site was just rebuilt from scratch, so there is no local sync manifest either
+
+    port, stop_server = start_ftp_server(ftp_root, latency)
+    ftp_upload.FTP_HOST, ftp_upload.FTP_PORT = "127.0.0.1", port
+    ftp_upload.FTP_USER = ftp_upload.FTP_PASS = "bench"
+    ftp_upload.FTP_DIR = "/"
+
+    def sync():
+        ftp = ftp_upload.connect_ftp()
+        ftp_upload.sync_directory(ftp, output_path, "/", connections)
+        ftp.quit()
+
+    try:
+        timed(phases, "ftp_full_sync", sync)
+        timed(phases, "ftp_noop_sync", sync)
+        touch_commentary(vault_path)
+        logging.disable(logging.CRITICAL)
+        try:
+            generate_html(incremental=True)
+        finally:
+            logging.disable(logging.NOTSET)
+        timed(phases, "ftp_one_change", sync)
+    finally:
+        stop_server()
+
+def vault_stats(vault_path, output_path):
+    """Size of the synthetic vault and of the generated site."""
+    stats = {"parashiyot": 0, "lines": 0, "commentaries": 0, "vault_bytes": 0, "pages": 0, "site_bytes": 0}
+    for book in os.listdir(vault_path):
+        if book.startswith("."):
+            continue
+        for parasha in os.listdir(os.path.join(vault_path, book)):
+            parasha_path = os.path.join(vault_path, book, parasha)
+            stats["parashiyot"] += 1
+            stats["commentaries"] += len(os.listdir(os.path.join(parasha_path, "perusim")))
+            for lang in ("HE", "EN", "HU"):
+                with open(os.path.join(parasha_path, f"{lang}.md"), "rb") as f:
+                    data = f.read()
+                stats["lines"] += data.count(b"\n") + 1
+                stats["vault_bytes"] += len(data)
+    for dirpath, _, filenames in os.walk(output_path):
+        for name in filenames:
+            stats["site_bytes"] += os.path.getsize(os.path.join(dirpath, name))
+            if name.endswith(".html") and name != "index.html":
+                stats["pages"] += 1
+    return stats
+
+def git_commit():
+    """Commit the benchmark ran on, so results can be compared over time."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(work_path, repeat=3, workers=1, ftp=True, ftp_latency=0.0, **vault_params):
+    """Generate a synthetic vault under work_path and time every build phase and the FTP sync.
+
+    Each phase runs `repeat` times on a fresh vault; returns the results as a JSON-ready dict.
+    """
+    if workers > 1 and multiprocessing.get_start_method() != "fork":
+        logger.warning("⚠ Worker processes only see the synthetic vault when forked, using 1 worker.")
+        workers = 1
+
+    vault_path = os.path.join(work_path, "vault")
+    output_path = os.path.join(work_path, "site")
+    use_paths(vault_path, output_path)
+    phases = {}
+
+    for run in range(repeat):
+        logger.info("⏱ Run %s/%s...", run + 1, repeat)
+        generate_vault(vault_path, **vault_params)
+        benchmark_phases(phases, vault_path, output_path)
+        benchmark_builds(phases, vault_path, output_path, workers)
+        if ftp:
+            benchmark_ftp(phases, vault_path, output_path, os.path.join(work_path, "ftp"), ftp_latency)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": dict(vault_params, repeat=repeat, workers=workers, ftp_latency=ftp_latency,
+                       sites=[list(site) for site in LANGUAGE_SITES]),
+        "vault": vault_stats(vault_path, output_path),
+        "phases": {
+            name: {"min": min(times), "median": statistics.median(times), "runs": times}
+            for name, times in phases.items()
+        },
+    }
+
+def log_results(results):
+    """Log a short human-readable summary of run_benchmark()'s results."""
+    vault = results["vault"]
+    logger.info("📚 %s parashiyot, %s lines, %s commentaries, %s pages (%.0f KB)", vault["parashiyot"],
+                vault["lines"], vault["commentaries"], vault["pages"], vault["site_bytes"] / 1024)
+    for name, timing in results["phases"].items():
+        logger.info("   %-18s %9.1f ms (median %.1f ms)", name, timing["min"] * 1000, timing["median"] * 1000)
+
+def save_results(results, path):
+    """Write run_benchmark()'s results as JSON, so runs can be compared over time."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    logger.info("💾 Results written to %s", path)
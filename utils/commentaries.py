@@ -0,0 +1,82 @@
+import os
+from utils.file_utils import read_markdown_file, render_markdown_many, file_hash
+
+# (path, mtime) → (hash, html); shared by every page rendered in this process,
+# so the HE-EN and HE-HU pages of a parasha render each commentary only once
+_loaded = {}
+
+def scan_commentaries(parasha_path):
+    """Index a parasha's perusim/ folder with a single directory scan: commentary id → (path, mtime)."""
+    index = {}
+    try:
+        entries = os.scandir(os.path.join(parasha_path, "perusim"))
+    except OSError:
+        return index
+
+    with entries:
+        for entry in entries:
+            if entry.name.endswith(".md") and entry.is_file():
+                index[entry.name[:-3]] = (entry.path, entry.stat().st_mtime)
+    return index
+
+def unique_commentaries(indexes):
+    """Commentaries whose id only one perusim/ folder of the vault has: id → (path, mtime).
+
+    indexes maps parasha paths to their scan_commentaries() result.
+    """
+    found = {}
+    for index in indexes.values():
+        for cid, entry in index.items():
+            found.setdefault(cid, []).append(entry)
+    return {cid: entries[0] for cid, entries in found.items() if len(entries) == 1}
+
+def resolve_links(index, link_ids, unique):
+    """Resolve a parasha's commentary links: its own perusim/ first, then, like in Obsidian,
+    the only commentary of that name in the vault (see unique_commentaries).
+
+    Returns (id → (path, mtime) of every commentary the links can show, id → path or None
+    of the links missing from perusim/, the latter if missing or ambiguous in the vault too).
+    """
+    linked = dict(index)
+    elsewhere = {}
+    for cid in link_ids:
+        if cid not in index and cid not in elsewhere:
+            entry = unique.get(cid)
+            elsewhere[cid] = entry and entry[0]
+            if entry:
+                linked[cid] = entry
+    return linked, elsewhere
+
+def load_commentary(path, mtime):
+    """Return (content hash, rendered HTML) of a commentary, reading and converting it only once per version.
+
+    The HTML comes from the persistent render cache unless the text is new.
+    """
+    key = (path, mtime)
+    if key not in _loaded:
+        _loaded[key] = (file_hash(path), render_markdown_many([read_markdown_file(path)])[0])
+    return _loaded[key]
+
+def find_broken_commentary_links(indexes, manifest, vault_path):
+    """Compare the perusim folders with the commentaries the built pages link to.
+
+    indexes maps parasha paths to their scan_commentaries() result, manifest is the
+    build manifest (whose keys include every commentary a page linked to, found or not).
+    Returns (dangling, orphaned) lists of vault-relative commentary paths.
+    """
+    linked = set()
+    for inputs in manifest.values():
+        linked.update(key for key in inputs if not key.startswith("#"))
+
+    dangling = set()
+    for inputs in manifest.values():
+        dangling.update(key for key, digest in inputs.items() if digest is None)
+
+    orphaned = set()
+    for index in indexes.values():
+        for path, _ in index.values():
+            key = os.path.relpath(path, vault_path)
+            if key not in linked:
+                orphaned.add(key)
+
+    return sorted(dangling), sorted(orphaned)
@@ -0,0 +1,308 @@
+import os
+import re
+import json
+import mmap
+import shutil
+import logging
+from array import array
+from bisect import bisect_left
+from utils.file_utils import read_markdown_file, remove_cssclasses, file_hash, text_hash, COMMENTARY_LINK_RE
+from utils.search import normalize
+
+logger = logging.getLogger(__name__)
+
+# Compiled books are kept here, one folder per vault; CORPUS_PATH moves them
+CORPUS_PATH = os.environ.get("CORPUS_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "corpus"))
+CORPUS_VERSION = file_hash(__file__)  # A parser change recompiles every book
+MANIFEST = "manifest.json"
+
+def extract_chapter_verse_en(line, current_chapter, current_verse):
+    """Extracts chapter and verse numbers from a line in HU.md"""
+    chapter_match = re.match(r"# Chapter (\d+)", line)
+    verse_match = re.match(r"\*\*(\d+)\.\*\*", line)
+
+    if chapter_match:
+        return int(chapter_match.group(1)), 0  # Reset verse when chapter changes
+    elif verse_match:
+        return current_chapter, int(verse_match.group(1))
+
+    return current_chapter, current_verse  # Keep last known values
+
+def extract_chapter_verse_hu(line, current_chapter, current_verse):
+    """Extracts chapter and verse numbers from a line in HU.md"""
+    chapter_match = re.match(r"# (\d+)\. fejezet", line)
+    verse_match = re.match(r"\*\*(\d+)\.\*\*", line)
+
+    if chapter_match:
+        return int(chapter_match.group(1)), 0  # Reset verse when chapter changes
+    elif verse_match:
+        return current_chapter, int(verse_match.group(1))
+
+    return current_chapter, current_verse  # Keep last known values
+
+# Translations whose headings give the chapter and verse numbers of the anchors
+VERSE_EXTRACTORS = {"EN": extract_chapter_verse_en, "HU": extract_chapter_verse_hu}
+
+HE_VERSE_RE = re.compile(r"\*\*\{[^}]*\}\*\*")
+TRANSLATION_VERSE_RE = re.compile(r"\*\*(\d+)\.\*\*")
+
+def line_positions(lines, lang):
+    """(chapter, verse) reached after each line, as read by the language's extractor ((0, 0) without one)."""
+    extract_chapter_verse = VERSE_EXTRACTORS.get(lang)
+    chapter = verse = 0
+    positions = []
+    for line in lines:
+        if extract_chapter_verse:
+            chapter, verse = extract_chapter_verse(line, chapter, verse)
+        positions.append((chapter, verse))
+    return positions
+
+def source_verses(lines, partner_positions):
+    """Verses of a source text: each **{n}** marker starts the next verse after the partner line's position.
+
+    Yields (chapter, verse, line number, start, end) with character offsets into the line.
+    """
+    for number, (line, (chapter, verse)) in enumerate(zip(lines, partner_positions)):
+        markers = list(HE_VERSE_RE.finditer(line))
+        for offset, match in enumerate(markers):
+            end = markers[offset + 1].start() if offset + 1 < len(markers) else len(line)
+            yield chapter, verse + offset, number, match.end(), end
+
+def translation_verses(lines, positions):
+    """Verses of a translation, numbered by its own **n.** markers within the chapter of its headings."""
+    for number, (line, (chapter, _)) in enumerate(zip(lines, positions)):
+        markers = list(TRANSLATION_VERSE_RE.finditer(line))
+        for offset, match in enumerate(markers):
+            end = markers[offset + 1].start() if offset + 1 < len(markers) else len(line)
+            yield chapter, int(match.group(1)), number, match.end(), end
+
+def vault_dir(vault_path):
+    """Folder of a vault's compiled books."""
+    return os.path.join(CORPUS_PATH, text_hash(os.path.abspath(vault_path))[:10])
+
+def book_dir(vault_path, book):
+    """Folder of a book's compiled store."""
+    slug = re.sub(r"[^a-z0-9]+", "-", normalize(book)).strip("-")
+    return os.path.join(vault_dir(vault_path), f"{slug}-{text_hash(book)[:8]}")
+
+def corpus_languages(sites):
+    """Every language of the configured sites."""
+    return sorted({lang for site in sites for lang in site[:2]})
+
+def list_parashiyot(vault_path, book, parashiyot):
+    """The parasha folders of a book, in vault order."""
+    return [parasha for parasha in parashiyot
+            if not parasha.startswith(".") and os.path.isdir(os.path.join(vault_path, book, parasha))]
+
+def load_manifest(path):
+    """Manifest of a compiled book, or {} if it was never compiled."""
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def book_is_current(manifest, vault_path, book, parashiyot, sites):
+    """Check whether a compiled book matches the vault: same parser, sites, parashiyot and source files."""
+    if (manifest.get("version") != CORPUS_VERSION or manifest.get("sites") != [list(site) for site in sites]
+            or list(manifest.get("parashiyot", {})) != parashiyot):
+        return False
+    for parasha in parashiyot:
+        recorded = manifest["parashiyot"][parasha]
+        for lang in manifest["languages"]:
+            path = os.path.join(vault_path, book, parasha, f"{lang}.md")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if lang in recorded:
+                    return False
+                continue
+            if lang not in recorded:
+                return False
+            mtime, size, digest = recorded[lang]["file"]
+            # Touched but identical files are accepted by their hash
+            if (stat.st_mtime_ns, stat.st_size) != (mtime, size) and file_hash(path) != digest:
+                return False
+    return True
+
+def write_replacing(path, data):
+    """Write a file under a temporary name and swap it in, so mapped old versions stay valid."""
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+def compile_book(vault_path, book, parashiyot, sites):
+    """Parse a book's language files into its compiled store.
+
+    Per language the store holds the text of every line (<lang>.txt), the byte offset
+    of each line (<lang>.lines), the (chapter, verse) reached after each line
+    (<lang>.pos) and the (chapter, verse, line, start, end) byte range of each verse
+    (<lang>.verses). The commentary links of each parasha are recorded in the manifest
+    as (line, byte offset, id), so no later step has to look for them again. Sources
+    are numbered like the pages anchor them: by the first site that pairs them with a
+    translation.
+    """
+    path = book_dir(vault_path, book)
+    os.makedirs(path, exist_ok=True)
+    languages = corpus_languages(sites)
+    blobs = {lang: bytearray() for lang in languages}
+    offsets = {lang: array("I", [0]) for lang in languages}
+    positions = {lang: array("I") for lang in languages}
+    verses = {lang: array("I") for lang in languages}
+    entries = {}
+
+    for parasha in parashiyot:
+        parasha_path = os.path.join(vault_path, book, parasha)
+        sources = {}
+        entry = entries[parasha] = {}
+        for lang in languages:
+            file = os.path.join(parasha_path, f"{lang}.md")
+            try:
+                stat = os.stat(file)
+            except OSError:
+                continue
+            lines = remove_cssclasses(read_markdown_file(file)).split("\n")
+            sources[lang] = (lines, line_positions(lines, lang), len(offsets[lang]) - 1)
+            entry[lang] = {"file": [stat.st_mtime_ns, stat.st_size, file_hash(file)],
+                           "lines": [len(offsets[lang]) - 1, len(lines)]}
+            links = entry[lang]["links"] = []
+            for number, (line, (chapter, verse)) in enumerate(zip(lines, sources[lang][1])):
+                if "[[" in line:
+                    for match in COMMENTARY_LINK_RE.finditer(line):
+                        start = len(blobs[lang]) + len(line[:match.start()].encode("utf-8"))
+                        links.append([number, start, match.group(1)])
+                blobs[lang] += line.encode("utf-8") + b"\n"
+                offsets[lang].append(len(blobs[lang]))
+                positions[lang].extend((chapter, verse))
+
+        numbered = set()
+        for lang1, lang2, _ in sites:
+            if lang1 not in sources or lang2 not in sources:
+                continue
+            spans = {}
+            if lang1 not in numbered:
+                spans[lang1] = source_verses(sources[lang1][0], sources[lang2][1])
+            if lang2 not in numbered:
+                spans[lang2] = translation_verses(sources[lang2][0], sources[lang2][1])
+            for lang, found in spans.items():
+                lines, _, first_line = sources[lang]
+                first = len(verses[lang]) // 5
+                for chapter, verse, number, start, end in found:
+                    line_start = offsets[lang][first_line + number]
+                    line = lines[number]
+                    start = line_start + len(line[:start].encode("utf-8"))
+                    end = line_start + len(line[:end].encode("utf-8"))
+                    verses[lang].extend((chapter, verse, number, start, end))
+                entry[lang]["verses"] = [first, len(verses[lang]) // 5 - first]
+                numbered.add(lang)
+
+    for lang in languages:
+        write_replacing(os.path.join(path, f"{lang}.txt"), bytes(blobs[lang]))
+        write_replacing(os.path.join(path, f"{lang}.lines"), offsets[lang].tobytes())
+        write_replacing(os.path.join(path, f"{lang}.pos"), positions[lang].tobytes())
+        write_replacing(os.path.join(path, f"{lang}.verses"), verses[lang].tobytes())
+    manifest = {"version": CORPUS_VERSION, "book": book, "sites": [list(site) for site in sites],
+                "languages": languages, "parashiyot": entries}
+    write_replacing(os.path.join(path, MANIFEST), json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+
+def compile_books(vault_path, books, sites):
+    """Compile the books ({book: folder names}) whose sources changed. Returns the number of books compiled."""
+    compiled = 0
+    for book, parashiyot in books.items():
+        parashiyot = list_parashiyot(vault_path, book, parashiyot)
+        if not book_is_current(load_manifest(book_dir(vault_path, book)), vault_path, book, parashiyot, sites):
+            compile_book(vault_path, book, parashiyot, sites)
+            compiled += 1
+    logger.info("📚 Corpus compiled (%s books rebuilt, %s unchanged).", compiled, len(books) - compiled)
+    return compiled
+
+def remove_stale_books(vault_path, books):
+    """Delete the compiled stores of books no longer in the vault tree."""
+    current = {os.path.basename(book_dir(vault_path, book)) for book in books}
+    if os.path.isdir(vault_dir(vault_path)):
+        for item in os.listdir(vault_dir(vault_path)):
+            if item not in current:
+                shutil.rmtree(os.path.join(vault_dir(vault_path), item))
+
+class BookCorpus:
+    """Memory-mapped compiled store of one book (see compile_book).
+
+    Lines and verses are read straight from the mapped files.
+    """
+
+    def __init__(self, path):
+        self.manifest = load_manifest(path)
+        self.parashiyot = self.manifest["parashiyot"]
+        self.blobs, self.offsets, self.positions, self.verse_table = {}, {}, {}, {}
+        for lang in self.manifest["languages"]:
+            self.blobs[lang] = map_file(os.path.join(path, f"{lang}.txt"))
+            self.offsets[lang] = map_file(os.path.join(path, f"{lang}.lines")).cast("I")
+            self.positions[lang] = map_file(os.path.join(path, f"{lang}.pos")).cast("I")
+            self.verse_table[lang] = map_file(os.path.join(path, f"{lang}.verses")).cast("I")
+
+    def has(self, parasha, *languages):
+        """Whether the parasha has a file in every one of the languages."""
+        entry = self.parashiyot.get(parasha, {})
+        return all(lang in entry for lang in languages)
+
+    def text(self, lang, start, end):
+        """Decode a byte range of a language's text."""
+        return bytes(self.blobs[lang][start:end]).decode("utf-8")
+
+    def lines(self, parasha, lang):
+        """The parasha's lines in a language, as read from its file."""
+        first, count = self.parashiyot[parasha][lang]["lines"]
+        offsets = self.offsets[lang]
+        return self.text(lang, offsets[first], offsets[first + count]).split("\n")[:-1]
+
+    def line_positions(self, parasha, lang):
+        """(chapter, verse) reached after each line of the parasha."""
+        first, count = self.parashiyot[parasha][lang]["lines"]
+        positions = self.positions[lang][2 * first:2 * (first + count)]
+        return list(zip(positions[::2], positions[1::2]))
+
+    def line_links(self, parasha, lang):
+        """Ids of the commentaries linked from each line of the parasha, in order."""
+        first, count = self.parashiyot[parasha][lang]["lines"]
+        links = [[] for _ in range(count)]
+        for line, _, cid in self.parashiyot[parasha][lang]["links"]:
+            links[line].append(cid)
+        return links
+
+    def link_ids(self, parasha, *languages):
+        """Ids of the commentaries linked from the parasha in any of the languages, once each."""
+        ids = {}
+        for lang in languages:
+            for _, _, cid in self.parashiyot[parasha].get(lang, {}).get("links", []):
+                ids[cid] = None
+        return list(ids)
+
+    def verses(self, parasha, lang):
+        """Yield (chapter, verse, line number, text, linked commentary ids) of the parasha's verses in a language."""
+        first, count = self.parashiyot[parasha].get(lang, {}).get("verses", (0, 0))
+        table = self.verse_table[lang]
+        links = self.parashiyot[parasha].get(lang, {}).get("links", [])
+        offsets = [offset for _, offset, _ in links]
+        for index in range(first, first + count):
+            chapter, verse, line, start, end = table[5 * index:5 * index + 5]
+            found = [cid for _, _, cid in links[bisect_left(offsets, start):bisect_left(offsets, end)]]
+            yield chapter, verse, line, self.text(lang, start, end), found
+
+def map_file(path):
+    """Read-only memoryview of a file's bytes, mapped rather than read."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")  # Empty files can't be mapped
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+# Compiled store folder → (manifest mtime, BookCorpus), per process
+_opened = {}
+
+def open_book(vault_path, book):
+    """Open a compiled book (see compile_books), reusing the mapping while it isn't recompiled."""
+    path = book_dir(vault_path, book)
+    stamp = os.stat(os.path.join(path, MANIFEST)).st_mtime_ns
+    opened = _opened.get(path)
+    if opened is None or opened[0] != stamp:
+        opened = _opened[path] = (stamp, BookCorpus(path))
+    return opened[1]
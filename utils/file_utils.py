@@ -1,6 +1,8 @@
 import os
 import markdown
 import re
+import hashlib
+from utils import render_cache
 
 def read_markdown_file(filepath):
     """Reads a Markdown file and converts it to HTML"""
@@ -9,6 +11,18 @@ def read_markdown_file(filepath):
     with open(filepath, "r", encoding="utf-8") as f:
         return f.read()
 
+def file_hash(filepath):
+    """Return the SHA-1 hex digest of a file's contents, or None if it doesn't exist"""
+    try:
+        with open(filepath, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def text_hash(text):
+    """Return the SHA-1 hex digest of a string"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
 def remove_cssclasses(md_text):
     md_text = re.sub(r"---\n.*?\n---\n", "", md_text, flags=re.DOTALL)
     return md_text
@@ -16,26 +30,47 @@ def remove_cssclasses(md_text):
 import markdown
 import re
 
+CAPTIONED_LINK_RE = re.compile(r'\[\[([^\]|]+)\|([^\]]+)\]\]')
+PLAIN_LINK_RE = re.compile(r'\[\[([^\]]+)\]\]')
+MD_LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+COMMENTARY_LINK_RE = re.compile(r'\[\[([^\]|]+)(?:\|[^\]]+)?\]\]')  # Target of either link style
+
+# Cached fragments are only reused while this module and the Markdown library are unchanged
+RENDERER_VERSION = f"{file_hash(__file__)}-{markdown.__version__}"
+
+_markdown = None
+
+def get_markdown():
+    """Return a shared Markdown converter, reset for the next document.
+
+    Creating a Markdown instance (parser, extensions, patterns) costs far more
+    than converting a single line, so one instance is reused per process.
+    """
+    global _markdown
+    if _markdown is None:
+        _markdown = markdown.Markdown()
+    return _markdown.reset()
+
+def replace_link(match):
+    """Convert Markdown links to JavaScript-highlighted commentary links."""
+    label, file = match.groups()
+    file_id = file.replace(".md", "")
+    return f'<a href="javascript:void(0);" onclick="highlightCommentary(\'{file_id}\')">{label}</a>'
+
 def markdown_to_html(md_text):
     """Convert Markdown text to HTML and handle both types of Obsidian-style links."""
 
-    def replace_link(match):
-        """Convert Markdown links to JavaScript-highlighted commentary links."""
-        label, file = match.groups()
-        file_id = file.replace(".md", "")
-        return f'<a href="javascript:void(0);" onclick="highlightCommentary(\'{file_id}\')">{label}</a>'
-
     # Handle both styles of Obsidian links:
     # [[link|caption]]  → <a href="#link">caption</a>
     # [[link which is a caption]] → <a href="#link-which-is-a-caption">link which is a caption</a>
 
     # First, process links with captions: [[id|display text]]
-    md_text = re.sub(r'\[\[([^\]|]+)\|([^\]]+)\]\]', 
+    md_text = CAPTIONED_LINK_RE.sub(
                      lambda m: f'<a href="#{m.group(1)}" class="commentary-link" onclick="highlightCommentary(\'{m.group(1)}\')">{m.group(2)}</a>', 
                      md_text)
 
     # Now, process links without captions: [[some text]] → <a href="#some-text">some text</a>
-    md_text = re.sub(r'\[\[([^\]]+)\]\]', 
+    md_text = PLAIN_LINK_RE.sub(
                      lambda m: f'<a href="#{m.group(1).replace(" ", "-")}" class="commentary-link" onclick="highlightCommentary(\'{m.group(1)}\')">{m.group(1)}</a>', 
                      md_text)
 
@@ -43,10 +78,31 @@ def markdown_to_html(md_text):
     md_text = md_text.replace("\n", "  \n\n")  # Add Markdown line break notation
 
     # Convert Markdown to HTML
-    md_html = markdown.markdown(md_text)
+    md_html = get_markdown().convert(md_text)
 
     # Replace standard Markdown links with JavaScript-highlighted commentary links
-    md_html = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', replace_link, md_html)
+    md_html = MD_LINK_RE.sub(replace_link, md_html)
 
     return md_html
 
+def strip_links(md_text):
+    """Markdown with Obsidian and Markdown links reduced to the text they display."""
+    md_text = CAPTIONED_LINK_RE.sub(r"\2", md_text)
+    md_text = PLAIN_LINK_RE.sub(r"\1", md_text)
+    return MD_LINK_RE.sub(r"\1", md_text)
+
+def render_markdown_many(texts):
+    """markdown_to_html() of each text, through the persistent render cache (see utils/render_cache.py)."""
+    return render_cache.render_many(texts, markdown_to_html, RENDERER_VERSION)
+
+def markdown_lines_to_html(lines):
+    """Convert every line of a file separately and return the list of HTML fragments.
+
+    Blank lines become "&nbsp;" (so table cells keep their height), and lines that
+    occur more than once in the file are only converted once. Lines rendered by an
+    earlier build are taken from the render cache.
+    """
+    lines = [line.strip() for line in lines]
+    unique = list(dict.fromkeys(line for line in lines if line))
+    rendered = dict(zip(unique, render_markdown_many(unique)))
+    return [rendered[line] if line else "&nbsp;" for line in lines]
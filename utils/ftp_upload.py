@@ -1,8 +1,26 @@
-from ftplib import FTP, error_perm
+from ftplib import FTP, error_perm, all_errors
 import os
+import io
+import json
+import calendar
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+from utils import profiling
 from config import FTP_HOST, FTP_USER, FTP_PASS, FTP_DIR, OUTPUT_PATH
+from utils.site_generator import BUILD_MANIFEST
+from utils.file_utils import file_hash
 import time
 
+FTP_CONNECTIONS = getattr(config, "FTP_CONNECTIONS", 4)  # Parallel logged-in connections for uploads
+FTP_PORT = getattr(config, "FTP_PORT", 21)
+
+SYNC_MANIFEST = ".sync-manifest.json"  # path → hash/size of every file, kept locally and on the server
+STAGING_MANIFEST = ".sync-staging.json"  # path → staging name of the uploads of an atomic deploy in progress
+
+logger = logging.getLogger(__name__)
+
 def remote_file_size(ftp, filename):
     """Return the size of a remote file, or None if it doesn't exist."""
     try:
@@ -28,15 +46,15 @@ def upload_directory(ftp, local_path, remote_path, level=0):
     indent = "  " * level  # Indentation for readability
 
     if not os.path.isdir(local_path):
-        print(f"{indent}❌ Skipping non-directory: {local_path}")
+        logger.error("%s❌ Skipping non-directory: %s", indent, local_path)
         return
 
     # Try to create remote directory if it doesn't exist
     try:
         ftp.mkd(remote_path)
-        print(f"{indent}📁 Created remote directory: {remote_path}")
+        logger.info("%s📁 Created remote directory: %s", indent, remote_path)
     except Exception:
-        print(f"{indent}📁 Remote directory exists: {remote_path}")
+        logger.debug("%s📁 Remote directory exists: %s", indent, remote_path)
 
     ftp.cwd(remote_path)
 
@@ -47,8 +65,11 @@ def upload_directory(ftp, local_path, remote_path, level=0):
         pass
 
     for item in os.listdir(local_path):
+        if item in (BUILD_MANIFEST, SYNC_MANIFEST):
+            continue  # Local build bookkeeping only
+
         local_item = os.path.join(local_path, item)
-        remote_item = f"{remote_path}/{item}"
+        remote_item = remote_join(remote_path, item)
 
         if os.path.isdir(local_item):
             upload_directory(ftp, local_item, remote_item, level + 1)
@@ -71,26 +92,395 @@ def upload_directory(ftp, local_path, remote_path, level=0):
                 try:
                     with open(local_item, "rb") as f:
                         ftp.storbinary(f"STOR {item}", f)
-                    print(f"{indent}📄 Uploaded {item} → {remote_item} ({local_size} bytes)")
+                    profiling.count("files_uploaded")
+                    profiling.count("bytes_uploaded", local_size)
+                    logger.info("%s📄 Uploaded %s → %s (%s bytes)", indent, item, remote_item, local_size)
                 except Exception as e:
-                    print(f"{indent}❌ Failed to upload {item} → {remote_item}: {e}")
+                    logger.error("%s❌ Failed to upload %s → %s: %s", indent, item, remote_item, e)
             else:
-                print(f"{indent}✅ Skipped (unchanged): {item}")
+                profiling.count("files_skipped")
+                logger.debug("%s✅ Skipped (unchanged): %s", indent, item)
 
     ftp.cwd("..")
 
 
-def upload_to_ftp():
-    """Uploads generated HTML files and static assets to FTP server."""
-    print("🚀 Starting FTP upload...")
-    ftp = FTP(FTP_HOST)
+class CountingFTP(FTP):
+    """FTP connection that counts the commands it sends for the build profile."""
+
+    def putcmd(self, line):
+        profiling.count("ftp_commands")
+        super().putcmd(line)
+
+def connect_ftp():
+    """Open and log in a new FTP connection."""
+    profiling.count("ftp_connections")
+    ftp = CountingFTP()
+    ftp.connect(FTP_HOST, FTP_PORT)
     ftp.login(FTP_USER, FTP_PASS)
-    print(f"✅ Logged in to FTP: {FTP_HOST}")
-    ftp.cwd(FTP_DIR)
+    return ftp
+
+def reconnect_if_dropped(ftp):
+    """Return ftp if its control connection is still alive, otherwise a new connection in its place."""
+    try:
+        ftp.voidcmd("NOOP")
+        return ftp
+    except all_errors:
+        ftp.close()  # Timed out while the pool was uploading
+        return connect_ftp()
+
+def staging_name(rel_path, digest):
+    """Hidden, content-addressed name a file is uploaded to before being swapped into place."""
+    directory, name = os.path.split(rel_path)
+    staged = f".{name}.{digest[:12]}.part"
+    return f"{directory}/{staged}" if directory else staged
+
+def upload_files(local_root, remote_root, rel_paths, connections=None, retries=2, staged=None):
+    """Upload files in parallel over a pool of logged-in connections.
+
+    Every worker thread keeps its own connection and stores files by absolute path,
+    so no one depends on the current directory. A dropped session is reconnected
+    and the file retried. Returns the list of files that were uploaded.
+
+    staged optionally maps files to the staging name they should be stored under
+    instead; partial staged files left by an earlier attempt are resumed with REST.
+    """
+    connections = connections or FTP_CONNECTIONS
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+    stats = {"bytes": 0, "failed": 0}
+
+    def upload(rel_path):
+        for attempt in range(retries + 1):
+            try:
+                if getattr(local, "ftp", None) is None:
+                    local.ftp = connect_ftp()
+                    with lock:
+                        opened.append(local.ftp)
+                size = os.path.getsize(os.path.join(local_root, rel_path))
+                offset = 0
+                if staged and rel_path in staged:
+                    target = remote_join(remote_root, staged[rel_path])
+                    local.ftp.voidcmd("TYPE I")  # SIZE is only reliable in binary mode
+                    offset = remote_file_size(local.ftp, target) or 0
+                    if offset > size:
+                        offset = 0
+                    elif offset == size and size > 0:
+                        logger.debug("✅ Already staged: %s", rel_path)
+                        return rel_path
+                else:
+                    target = remote_join(remote_root, rel_path)
+
+                with open(os.path.join(local_root, rel_path), "rb") as f:
+                    f.seek(offset)
+                    local.ftp.storbinary(f"STOR {target}", f, rest=offset or None)
+                with lock:
+                    stats["bytes"] += size - offset
+                if offset:
+                    logger.debug("📄 Resumed %s at byte %d (%d bytes)", rel_path, offset, size)
+                else:
+                    logger.debug("📄 Uploaded %s (%d bytes)", rel_path, size)
+                return rel_path
+            except error_perm as e:
+                logger.error("❌ Failed to upload %s: %s", rel_path, e)
+                break  # Permanent error, retrying won't help
+            except all_errors as e:
+                logger.warning("⚠ Connection problem uploading %s (attempt %s): %s", rel_path, attempt + 1, e)
+                profiling.count("upload_retries")
+                if getattr(local, "ftp", None) is not None:
+                    local.ftp.close()
+                    with lock:
+                        opened.remove(local.ftp)
+                local.ftp = None  # Reconnect on the next attempt
+        with lock:
+            stats["failed"] += 1
+        return None
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        uploaded = [rel_path for rel_path in pool.map(upload, rel_paths) if rel_path]
+
+    for ftp in opened:
+        try:
+            ftp.quit()
+        except all_errors:
+            ftp.close()
+
+    elapsed = time.time() - start
+    profiling.count("files_uploaded", len(uploaded))
+    profiling.count("bytes_uploaded", stats["bytes"])
+    profiling.count("files_failed", stats["failed"])
+    logger.info("📊 Uploaded %s files, %.1f KB in %.2fs over %s connections (%s failed).",
+                len(uploaded), stats["bytes"] / 1024, elapsed, len(opened), stats["failed"])
+    return uploaded
+
+def remote_site_root(ftp, remote_dir):
+    """Absolute path of the site folder, so that every connection (pooled or reconnected) resolves paths alike.
+
+    A relative remote_dir (e.g. "www") is taken from the login directory.
+    """
+    ftp.cwd(remote_dir)
+    return ftp.pwd()
+
+def remote_join(remote_root, rel_path):
+    """Absolute remote path of a file given relative to the site root."""
+    return f"{remote_root.rstrip('/')}/{rel_path}" if remote_root else rel_path
+
+def build_local_manifest(local_root, previous=None):
+    """Map every file under local_root (relative, '/'-separated path) to its content hash and size.
+
+    Hashes are reused from the previous local manifest for files whose size and mtime are unchanged.
+    """
+    previous = previous or {}
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(local_root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name in (BUILD_MANIFEST, SYNC_MANIFEST):
+                continue
+            local_item = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(local_item, local_root).replace(os.sep, "/")
+            stat = os.stat(local_item)
+            old = previous.get(rel_path)
+            if old and old["size"] == stat.st_size and old.get("mtime") == stat.st_mtime:
+                digest = old["hash"]
+            else:
+                digest = file_hash(local_item)
+            manifest[rel_path] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime}
+    return manifest
+
+def download_remote_manifest(ftp, remote_root, name=SYNC_MANIFEST):
+    """Fetch the manifest stored with the remote site, or None if there isn't one."""
+    buffer = io.BytesIO()
+    try:
+        ftp.retrbinary(f"RETR {remote_join(remote_root, name)}", buffer.write)
+        return json.loads(buffer.getvalue().decode("utf-8"))
+    except (error_perm, ValueError):
+        return None
+
+def mlsd_tree(ftp, remote_path, prefix=""):
+    """List a remote tree with one MLSD per directory: relative path → (size, mtime).
+
+    Returns None if the server doesn't support MLSD.
+    """
+    try:
+        entries = list(ftp.mlsd(remote_path or ".", facts=["type", "size", "modify"]))
+    except error_perm:
+        return None
+
+    listing = {}
+    for name, facts in entries:
+        if facts.get("type") == "dir":
+            sub_listing = mlsd_tree(ftp, remote_join(remote_path, name), f"{prefix}{name}/")
+            listing.update(sub_listing or {})
+        elif facts.get("type") == "file":
+            mtime = None
+            if "modify" in facts:
+                # Format: YYYYMMDDHHMMSS[.sss] in UTC
+                mtime = calendar.timegm(time.strptime(facts["modify"][:14], "%Y%m%d%H%M%S"))
+            listing[f"{prefix}{name}"] = (int(facts.get("size", -1)), mtime)
+    return listing
+
+def manifest_from_listing(listing, local_manifest):
+    """Guess a remote manifest for a server without one, using the size/mtime rule of upload_directory."""
+    remote = {}
+    for rel_path, (size, mtime) in listing.items():
+        local = local_manifest.get(rel_path)
+        # Allowing 2s tolerance for FTP time rounding
+        if local and size == local["size"] and mtime is not None and abs(mtime - local["mtime"]) <= 2:
+            remote[rel_path] = local
+    return remote
+
+def swap_staged_file(ftp, source, target):
+    """Rename a staged upload over a live file (RNFR/RNTO).
+
+    Servers that refuse to rename onto an existing file get the live file renamed
+    aside (name.old) first; it is restored if the staged file can't take its place,
+    and deleted once it has.
+    """
+    try:
+        ftp.rename(source, target)
+        return
+    except error_perm:
+        pass  # Maybe an existing target; a missing one fails again below
+    aside = f"{target}.old"
+    try:
+        ftp.rename(target, aside)
+    except error_perm:
+        ftp.rename(source, target)  # Nothing to move aside: the target was missing
+        return
+    try:
+        ftp.rename(source, target)
+    except all_errors:
+        ftp.rename(aside, target)  # Roll back, the live file stays as it was
+        raise
+    try:
+        ftp.delete(aside)
+    except error_perm as e:
+        logger.warning("⚠ Could not delete %s: %s", aside, e)
+
+def swap_staged_files(ftp, remote_root, staged):
+    """Rename staged uploads over the live files. Returns the files swapped in."""
+    swapped = []
+    start = time.time()
+    for rel_path, staged_path in staged.items():
+        try:
+            swap_staged_file(ftp, remote_join(remote_root, staged_path), remote_join(remote_root, rel_path))
+            swapped.append(rel_path)
+        except error_perm as e:
+            logger.error("❌ Failed to move %s into place: %s", staged_path, e)
+    logger.info("🔀 Swapped %d files into place in %.2fs.", len(swapped), time.time() - start)
+    return swapped
+
+def remove_abandoned_staging(ftp, remote_root, staged):
+    """Delete the staged uploads of an interrupted atomic deploy that this deploy won't resume.
+
+    The deploy records its staging names in STAGING_MANIFEST before uploading, so no
+    listing is needed: a staged file whose name (and so content hash) isn't in staged
+    any more is deleted. Returns whether a staging record was found.
+    """
+    pending = download_remote_manifest(ftp, remote_root, STAGING_MANIFEST)
+    if pending is None:
+        return False
+    abandoned = sorted(name for rel_path, name in pending.items() if staged.get(rel_path) != name)
+    if abandoned:
+        remove_remote_files(ftp, remote_root, abandoned)
+    return True
+
+def remove_remote_files(ftp, remote_root, rel_paths):
+    """Delete files from the server's site folder; ones already gone are ignored."""
+    removed = 0
+    for rel_path in rel_paths:
+        try:
+            ftp.delete(remote_join(remote_root, rel_path))
+            removed += 1
+            logger.debug("🗑 Removed remote file: %s", rel_path)
+        except error_perm:
+            pass
+    profiling.count("files_removed", removed)
+    logger.info("🗑 Removed %d remote files no longer in the site.", removed)
 
-    upload_directory(ftp, OUTPUT_PATH, FTP_DIR)
+def sync_directory(ftp, local_root, remote_root, connections=None, atomic=False):
+    """Upload only the files whose content differs from the remote manifest, then update the manifest.
 
-    ftp.quit()
-    print("✅ Site uploaded to FTP (including static assets).")
+    On an unchanged site this costs a single manifest download. Changed files are
+    uploaded over `connections` parallel connections (default: FTP_CONNECTIONS).
+    Files the remote manifest lists but the site no longer has are deleted afterwards.
+
+    With atomic=True the files are first uploaded under staging names (resuming
+    partial uploads of an interrupted deploy) and only then renamed into place in
+    one short final phase, so visitors never see a half-updated site. Staged files of
+    an interrupted deploy whose content changed since are deleted.
+    """
+    local_manifest_path = os.path.join(local_root, SYNC_MANIFEST)
+    with profiling.phase("upload: local manifest"):
+        try:
+            with open(local_manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        local = build_local_manifest(local_root, previous)
+        with open(local_manifest_path, "w", encoding="utf-8") as f:
+            json.dump(local, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    with profiling.phase("upload: remote manifest"):
+        remote = download_remote_manifest(ftp, remote_root)
+        if remote is None:
+            listing = mlsd_tree(ftp, remote_root)
+            if listing is None:
+                logger.info("📋 No remote manifest and no MLSD support: uploading everything once.")
+                remote = {}
+            else:
+                logger.info("📋 No remote manifest: comparing against the MLSD listing.")
+                remote = manifest_from_listing(listing, local)
+
+    changed = [rel_path for rel_path, entry in local.items()
+               if remote.get(rel_path, {}).get("hash") != entry["hash"]]
+    # Files an earlier deploy uploaded that the site no longer has (e.g. old fingerprinted assets)
+    stale = sorted(rel_path for rel_path in remote if rel_path not in local)
+    if not changed and not stale:
+        profiling.count("files_skipped", len(local))
+        logger.info("✅ Remote site is up to date.")
+        return
+
+    # Only create directories the remote site doesn't have files in yet
+    known_dirs = {os.path.dirname(rel_path) for rel_path in remote}
+    for directory in sorted({os.path.dirname(rel_path) for rel_path in changed} - known_dirs):
+        parts = directory.split("/")
+        for depth in range(1, len(parts) + 1):
+            partial = "/".join(parts[:depth])
+            if partial in known_dirs:
+                continue
+            try:
+                ftp.mkd(remote_join(remote_root, partial))
+                logger.debug("📁 Created remote directory: %s", partial)
+            except error_perm:
+                pass  # Exists already
+            known_dirs.add(partial)
+
+    new_remote = {rel_path: entry for rel_path, entry in remote.items() if rel_path in local}
+    staged = {rel_path: staging_name(rel_path, local[rel_path]["hash"]) for rel_path in changed} if atomic else {}
+    staging_record = remove_abandoned_staging(ftp, remote_root, staged)
+    if staged:
+        data = json.dumps(staged, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8")
+        ftp.storbinary(f"STOR {remote_join(remote_root, STAGING_MANIFEST)}", io.BytesIO(data))
+        staging_record = True
+    if atomic:
+        with profiling.phase("upload: files"):
+            uploaded = upload_files(local_root, remote_root, changed, connections, staged=staged)
+    else:
+        with profiling.phase("upload: files"):
+            uploaded = upload_files(local_root, remote_root, changed, connections)
+
+    # The caller closes ftp; a connection opened here in its place is closed here
+    session = reconnect_if_dropped(ftp)
+    try:
+        if atomic:
+            with profiling.phase("upload: swap"):
+                uploaded = swap_staged_files(session, remote_root,
+                                             {rel_path: staged[rel_path] for rel_path in uploaded})
+        for rel_path in uploaded:
+            new_remote[rel_path] = local[rel_path]
+        if stale:
+            remove_remote_files(session, remote_root, stale)
+
+        # Written last, so an interrupted deploy is simply diffed again next time
+        data = json.dumps(new_remote, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8")
+        session.storbinary(f"STOR {remote_join(remote_root, SYNC_MANIFEST)}", io.BytesIO(data))
+        if staging_record and len(uploaded) == len(changed):
+            session.delete(remote_join(remote_root, STAGING_MANIFEST))  # Nothing left staged
+    finally:
+        if session is not ftp:
+            try:
+                session.quit()
+            except all_errors:
+                session.close()
+    profiling.count("files_skipped", len(local) - len(changed))
+    logger.info("✅ %s changed files synced, %s unchanged.", len(changed), len(local) - len(changed))
+
+def upload_to_ftp(use_manifest=True, connections=None, atomic=False):
+    """Uploads generated HTML files and static assets to FTP server.
+
+    By default the remote manifest decides what to upload; use_manifest=False
+    compares every remote file (NLST/SIZE/MDTM) instead. atomic=True stages the
+    changed files and swaps them in at the end (see sync_directory).
+    """
+    logger.info("🚀 Starting FTP upload...")
+    with profiling.phase("upload: connect"):
+        ftp = connect_ftp()
+    logger.info("✅ Logged in to FTP: %s", FTP_HOST)
+    remote_root = remote_site_root(ftp, FTP_DIR)
+
+    if use_manifest:
+        sync_directory(ftp, OUTPUT_PATH, remote_root, connections, atomic)
+    else:
+        with profiling.phase("upload: files"):
+            upload_directory(ftp, OUTPUT_PATH, remote_root)
+
+    try:
+        ftp.quit()
+    except all_errors:
+        ftp.close()
+    logger.info("✅ Site uploaded to FTP (including static assets).")
 
 
@@ -0,0 +1,273 @@
+import os
+import re
+import logging
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import config
+from config import VAULT_PATH
+from requests import RequestException
+from utils.sefaria import fetch_chapters, SefariaError
+from utils.search import normalize
+from utils.site_generator import SEFARIA_BOOK_MAP
+
+logger = logging.getLogger(__name__)
+
+# First verse (Hebrew versification, as on Sefaria) of every parasha
+PARASHIYOT = {
+    "Genesis": [("Bereshit", 1, 1), ("Noach", 6, 9), ("Lech Lecha", 12, 1), ("Vayera", 18, 1),
+                ("Chayei Sara", 23, 1), ("Toldot", 25, 19), ("Vayetzei", 28, 10), ("Vayishlach", 32, 4),
+                ("Vayeshev", 37, 1), ("Miketz", 41, 1), ("Vayigash", 44, 18), ("Vayechi", 47, 28)],
+    "Exodus": [("Shemot", 1, 1), ("Vaera", 6, 2), ("Bo", 10, 1), ("Beshalach", 13, 17), ("Yitro", 18, 1),
+               ("Mishpatim", 21, 1), ("Terumah", 25, 1), ("Tetzaveh", 27, 20), ("Ki Tisa", 30, 11),
+               ("Vayakhel", 35, 1), ("Pekudei", 38, 21)],
+    "Leviticus": [("Vayikra", 1, 1), ("Tzav", 6, 1), ("Shmini", 9, 1), ("Tazria", 12, 1), ("Metzora", 14, 1),
+                  ("Achrei Mot", 16, 1), ("Kedoshim", 19, 1), ("Emor", 21, 1), ("Behar", 25, 1),
+                  ("Bechukotai", 26, 3)],
+    "Numbers": [("Bamidbar", 1, 1), ("Nasso", 4, 21), ("Beha'alotcha", 8, 1), ("Sh'lach", 13, 1),
+                ("Korach", 16, 1), ("Chukat", 19, 1), ("Balak", 22, 2), ("Pinchas", 25, 10), ("Matot", 30, 2),
+                ("Masei", 33, 1)],
+    "Deuteronomy": [("Devarim", 1, 1), ("Vaetchanan", 3, 23), ("Eikev", 7, 12), ("Re'eh", 11, 26),
+                    ("Shoftim", 16, 18), ("Ki Teitzei", 21, 10), ("Ki Tavo", 26, 1), ("Nitzavim", 29, 9),
+                    ("Vayeilech", 31, 1), ("Ha'Azinu", 32, 1), ("V'Zot HaBerachah", 33, 1)],
+}
+CHAPTERS = {"Genesis": 50, "Exodus": 40, "Leviticus": 27, "Numbers": 36, "Deuteronomy": 34}
+
+# Vault folder names that don't match the transliteration above, e.g. {"Beha'alotcha": "Beháálotchá"}
+PARASHA_FOLDERS = getattr(config, "PARASHA_FOLDERS", {})
+
+EN_PARAMS = {
+    "lang": "en", "commentary": 0, "context": 0, "vside": 0,
+    "version": "The_Contemporary_Torah,_Jewish_Publication_Society,_2006",
+}
+
+MAQAF = "־"  # Hebrew maqqaf
+HEBREW_VALUES = dict(zip("אבגדהוזחטיכלמנסעפצקרשת", [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 20, 30, 40, 50, 60, 70, 80,
+                                                     90, 100, 200, 300, 400]))
+NUMERAL_LETTERS = sorted(HEBREW_VALUES.items(), key=lambda item: -item[1])
+HEBREW_VALUES.update({"ך": 20, "ם": 40, "ן": 50, "ף": 80, "ץ": 90})
+
+HE_HEADING_RE = re.compile(r"^\s*\S+ פרק[-־ ](\S+)\s*$")
+HE_TOKEN_RE = re.compile(r"\{([^}]+)\}|\([ספ]\)")
+HU_HEADING_RE = re.compile(r"(\d+)\. fejezet")
+HU_VERSE_RE = re.compile(r"(\d+)\. (.+)")
+SEFARIA_BREAK_RE = re.compile(r"[{][פס][}]")
+
+def hebrew_number(letters):
+    """Value of a number written in Hebrew letters (לב → 32, טז → 16)."""
+    return sum(HEBREW_VALUES.get(letter, 0) for letter in letters)
+
+def hebrew_numeral(number):
+    """Hebrew letters of a number, as the sources write chapter and verse numbers (15 → טו)."""
+    letters = ""
+    for letter, value in NUMERAL_LETTERS:
+        if number in (15, 16):  # Not יה and יו, which spell the Name
+            return letters + ("טו" if number == 15 else "טז")
+        while number >= value:
+            letters += letter
+            number -= value
+    return letters
+
+def clean_text(raw):
+    """Remove HTML tags, footnotes and asterisks from Sefaria text (the Name becomes Hashem)."""
+    raw = re.sub(r'<i class="footnote">.*?</i>', '', raw, flags=re.DOTALL)
+    raw = re.sub(r'<[^>]+>', '', raw)
+    raw = re.sub(r"[*]", "", raw)
+    raw = re.sub(r"יהוה", "Hashem", raw)
+    return raw.strip()
+
+def read_he(path, breaks):
+    """Stream (chapter, verse, text) from a Hebrew source (he.txt format: "<book> פרק-<n>" headings, {n} verses).
+
+    Every (ס)/(פ) paragraph sign adds the verse after it to breaks, before that verse is yielded.
+    """
+    chapter = verse = None
+    text = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.replace("-", MAQAF)
+            heading = HE_HEADING_RE.match(line)
+            if heading:
+                if verse is not None:
+                    yield chapter, verse, " ".join(part for part in text if part)
+                chapter, verse, text = hebrew_number(heading.group(1)), None, []
+                continue
+
+            position = 0
+            for token in HE_TOKEN_RE.finditer(line):
+                text.append(line[position:token.start()].strip())
+                position = token.end()
+                if token.group(1) is None:  # Paragraph sign
+                    if verse is not None:
+                        breaks.add((chapter, verse + 1))
+                    continue
+                if verse is not None:
+                    yield chapter, verse, " ".join(part for part in text if part)
+                verse, text = hebrew_number(token.group(1)), []
+            text.append(line[position:].strip())
+    if verse is not None:
+        yield chapter, verse, " ".join(part for part in text if part)
+
+def read_hu(path):
+    """Stream (chapter, verse, text) from a Hungarian source ("<n>. fejezet" headings, "<n>. text" verse lines)."""
+    chapter = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            heading = HU_HEADING_RE.match(line)
+            if heading:
+                chapter = int(heading.group(1))
+                continue
+            verse = HU_VERSE_RE.match(line)
+            if verse and chapter:  # Section titles and blank lines are skipped
+                yield chapter, int(verse.group(1)), verse.group(2)
+
+def read_en(book):
+    """Stream (chapter, verse, text) of the English translation of a book from Sefaria (cached on disk)."""
+    chapters = range(1, CHAPTERS[book] + 1)
+    for chapter, data in zip(chapters, fetch_chapters(book, chapters, EN_PARAMS)):
+        text = data.get("text", [])
+        for verse, raw in enumerate(text, start=1):
+            yield chapter, verse, clean_text(raw)
+
+def sefaria_breaks(book):
+    """Paragraph breaks of a book from Sefaria's Hebrew text: the verse after each {פ}/{ס}."""
+    breaks = set()
+    chapters = range(1, CHAPTERS[book] + 1)
+    for chapter, data in zip(chapters, fetch_chapters(book, chapters, {"context": 0})):
+        for verse, raw in enumerate(data.get("he", []), start=1):
+            if SEFARIA_BREAK_RE.search(re.sub(r"<[^>]+>", "", raw)):
+                breaks.add((chapter, verse + 1))
+    return breaks
+
+# Per language: chapter heading, verse, and what goes before the first line
+FORMATS = {
+    "HE": (lambda chapter: f"# {hebrew_numeral(chapter)}",
+           lambda verse, text: f"**{{{hebrew_numeral(verse)}}}** {text}",
+           "---\ncssclasses: he\n---\n"),
+    "HU": (lambda chapter: f"# {chapter}. fejezet", lambda verse, text: f"**{verse}.** {text}", ""),
+    "EN": (lambda chapter: f"# Chapter {chapter}", lambda verse, text: f"**{verse}.** {text}", ""),
+}
+
+def folder_key(name):
+    """Loose spelling of a parasha name, so Sefaria's "Vayishlach" finds the vault's "Vájislách"."""
+    key = re.sub(r"[^a-z]", "", normalize(name))
+    for spelling, common in (("sh", "s"), ("tz", "c"), ("y", "j")):
+        key = key.replace(spelling, common)
+    return key
+
+def parasha_folders(book_path, book):
+    """Vault folder of every parasha of a book: configured, existing (by loose spelling) or the Sefaria name."""
+    existing = {}
+    if os.path.isdir(book_path):
+        existing = {folder_key(name): name for name in os.listdir(book_path)}
+    return {name: PARASHA_FOLDERS.get(name) or existing.get(folder_key(name), name)
+            for name, _, _ in PARASHIYOT[book]}
+
+def write_parashiyot(book, lang, verses, breaks, book_path, folders, force=False):
+    """Lay a stream of (chapter, verse, text) out as <parasha>/<lang>.md files of the vault.
+
+    Every chapter starts with its heading and every paragraph (per breaks) is one line,
+    the same in every language, so the pages line the translations up row by row.
+    Existing files are kept unless force is set. Returns (written, kept) paths.
+    """
+    heading, format_verse, preamble = FORMATS[lang]
+    starts = [(chapter, verse) for _, chapter, verse in PARASHIYOT[book]]
+    written, kept = [], []
+    parasha = chapter = None
+    lines, paragraph = [], []
+
+    def flush_paragraph():
+        if paragraph:
+            lines.append(" ".join(paragraph))
+            paragraph.clear()
+
+    def write():
+        flush_paragraph()
+        if parasha is None:
+            return
+        path = os.path.join(book_path, folders[parasha], f"{lang}.md")
+        if os.path.exists(path) and not force:
+            kept.append(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(preamble + "\n".join(lines))
+        written.append(path)
+
+    for chapter_number, verse, text in verses:
+        name = PARASHIYOT[book][max(bisect_right(starts, (chapter_number, verse)) - 1, 0)][0]
+        if name != parasha:
+            write()
+            parasha, chapter, lines = name, None, []
+        if chapter_number != chapter:
+            flush_paragraph()
+            lines.append(heading(chapter_number))
+            chapter = chapter_number
+        elif (chapter_number, verse) in breaks:
+            flush_paragraph()
+        paragraph.append(format_verse(verse, text))
+    write()
+    return written, kept
+
+def ingest_book(job):
+    """Import every source of one book; takes a single job tuple so books can be mapped over a process pool.
+
+    sources maps languages to files (the English comes from Sefaria). Paragraph breaks
+    come from the Hebrew source when there is one, otherwise from Sefaria.
+    """
+    book, sources, vault_path, force = job
+    book_folder = next(folder for folder, name in SEFARIA_BOOK_MAP.items() if name == book)
+    book_path = os.path.join(vault_path, book_folder)
+    folders = parasha_folders(book_path, book)
+    written, kept = [], []
+
+    breaks = set()
+    if "HE" in sources:
+        # Written first: the translations need all of its paragraph breaks
+        results = [write_parashiyot(book, "HE", read_he(sources["HE"], breaks), breaks, book_path, folders, force)]
+    else:
+        try:
+            breaks = sefaria_breaks(book)
+        except (SefariaError, RequestException) as e:
+            logger.warning("⚠ No paragraph breaks for %s (%s), one line per chapter", book, e)
+        results = []
+
+    if "HU" in sources:
+        results.append(write_parashiyot(book, "HU", read_hu(sources["HU"]), breaks, book_path, folders, force))
+    if "EN" in sources:
+        try:
+            results.append(write_parashiyot(book, "EN", read_en(book), breaks, book_path, folders, force))
+        except (SefariaError, RequestException) as e:
+            logger.error("❌ Failed to fetch the English text of %s: %s", book, e)
+
+    for paths, skipped in results:
+        written += paths
+        kept += skipped
+    return book, written, kept
+
+def ingest(sources, vault_path=VAULT_PATH, workers=1, force=False):
+    """Import source texts into the vault's <book>/<parasha>/<lang>.md layout, one book per worker process.
+
+    sources is a list of (language, Sefaria book name, file or None for the English from Sefaria).
+    Raises ValueError if a book has more than one source in the same language.
+    """
+    books = {}
+    for lang, book, path in sources:
+        langs = books.setdefault(book, {})
+        if lang in langs:
+            raise ValueError(f"{lang.lower()}:{book} given twice ({langs[lang] or 'Sefaria'} and {path or 'Sefaria'})")
+        langs[lang] = path
+    jobs = [(book, langs, vault_path, force) for book, langs in books.items()]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(ingest_book, jobs))
+    else:
+        results = [ingest_book(job) for job in jobs]
+
+    for book, written, kept in results:
+        for path in written:
+            logger.debug("📝 %s", os.path.relpath(path, vault_path))
+        for path in kept:
+            logger.warning("⚠ Kept existing %s (use --force to overwrite)", os.path.relpath(path, vault_path))
+        logger.info("✅ %s: %s files written, %s kept.", book, len(written), len(kept))
@@ -0,0 +1,16 @@
+import sys
+import logging
+
+def setup_logging(quiet=False, verbose=False):
+    """Show the build and upload messages on the console.
+
+    quiet keeps only warnings and errors; verbose adds per-file details. Log calls
+    pass their arguments %-style, so messages below the level are never formatted.
+    """
+    logger = logging.getLogger("utils")
+    logger.setLevel(logging.WARNING if quiet else logging.DEBUG if verbose else logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.propagate = False
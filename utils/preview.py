@@ -0,0 +1,247 @@
+import os
+import time
+import logging
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from config import VAULT_PATH, OUTPUT_PATH
+from utils.site_generator import (BuildContext, generate_html, rebuild_parasha, copy_static_files,
+                                  load_build_manifest, save_build_manifest, STATIC_PATH)
+
+try:
+    from watchdog.observers import Observer
+except ImportError:  # Optional: without watchdog the sources are polled
+    Observer = None
+
+TEMPLATES_PATH = "templates"
+
+logger = logging.getLogger(__name__)
+
+# Injected into every served page: long-polls /__reload and reloads when the build version changes
+RELOAD_SCRIPT = b"""<script>
+(function poll(v) {
+    fetch("/__reload?v=" + v).then(r => r.text()).then(n => {
+        if (v && n !== v) location.reload(); else poll(n);
+    }).catch(() => setTimeout(() => poll(v), 1000));
+})("");
+</script>
+"""
+
+class BuildVersion:
+    """Counter bumped after every rebuild; waiting browsers are woken up."""
+
+    def __init__(self):
+        self.value = 1
+        self.changed = threading.Condition()
+
+    def bump(self):
+        with self.changed:
+            self.value += 1
+            self.changed.notify_all()
+
+    def wait(self, seen, timeout=25):
+        with self.changed:
+            self.changed.wait_for(lambda: str(self.value) != seen, timeout)
+            return str(self.value)
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serves OUTPUT_PATH, adds the reload script to HTML pages and answers /__reload."""
+
+    version = None
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for build messages
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/__reload":
+            seen = parse_qs(url.query).get("v", [""])[0]
+            body = (self.version.wait(seen) if seen else str(self.version.value)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not (path.endswith(".html") and os.path.isfile(path)):
+            return super().do_GET()
+
+        with open(path, "rb") as f:
+            body = f.read().replace(b"</body>", RELOAD_SCRIPT + b"</body>", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def is_source(path):
+    """Whether a path under the watched folders is one the site is built from.
+
+    Hidden files and folders are left out, Obsidian's settings too, except its bookmarks (the sort order).
+    """
+    path = os.path.abspath(path)
+    if path == os.path.abspath(os.path.join(VAULT_PATH, ".obsidian", "bookmarks.json")):
+        return True
+    for root in (VAULT_PATH, TEMPLATES_PATH, STATIC_PATH):
+        relative = os.path.relpath(path, os.path.abspath(root))
+        if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+            return not any(part.startswith(".") for part in relative.split(os.sep))
+    return False
+
+def snapshot():
+    """mtime of every file the site is built from (see is_source)."""
+    files = {}
+    bookmarks = os.path.join(VAULT_PATH, ".obsidian", "bookmarks.json")
+    if os.path.exists(bookmarks):
+        files[bookmarks] = os.stat(bookmarks).st_mtime_ns
+    for root in (VAULT_PATH, TEMPLATES_PATH, STATIC_PATH):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    files[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass  # Deleted while walking
+    return files
+
+def poll_changes(interval=0.1, max_interval=2.0):
+    """Yield the sets of source files changed between two snapshots.
+
+    Every snapshot walks and stats the whole vault, templates and static folders, a few
+    ms for a small vault but far more for a large one, so the interval doubles while
+    nothing changes, up to max_interval, and drops back to interval after an edit.
+    """
+    previous = snapshot()
+    delay = interval
+    while True:
+        time.sleep(delay)
+        current = snapshot()
+        changed = {path for path in previous.keys() | current.keys()
+                   if previous.get(path) != current.get(path)}
+        previous = current
+        if changed:
+            delay = interval
+            yield changed
+        else:
+            delay = min(delay * 2, max_interval)
+
+class ChangeCollector:
+    """watchdog event handler gathering the source paths changed since the watch loop last took them."""
+
+    def __init__(self):
+        self.paths = set()
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+
+    def dispatch(self, event):
+        if event.is_directory and event.event_type == "modified":
+            return  # A change inside a folder is reported for the file itself
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return  # Opened or closed without writing
+        paths = {event.src_path, getattr(event, "dest_path", "")} - {""}
+        with self.lock:
+            self.paths.update(path for path in paths if is_source(path))
+            if self.paths:
+                self.pending.set()
+
+    def take(self):
+        with self.lock:
+            paths, self.paths = self.paths, set()
+            self.pending.clear()
+        return paths
+
+def observe_changes(interval=0.1):
+    """Yield the sets of source files changed, as the OS reports them through watchdog (no rescans)."""
+    collector = ChangeCollector()
+    observer = Observer()
+    for root in (VAULT_PATH, TEMPLATES_PATH, STATIC_PATH):
+        observer.schedule(collector, root, recursive=True)
+    observer.start()
+    try:
+        while True:
+            while not collector.pending.wait(1):
+                pass  # Timeout keeps Ctrl+C working everywhere
+            time.sleep(interval)  # Let a save touching several files finish
+            yield collector.take()
+    finally:
+        observer.stop()
+        observer.join()
+
+def apply_changes(changed, context, manifest):
+    """Rebuild what the changed files affect. Returns the (possibly reloaded) build context."""
+    static_root = os.path.abspath(STATIC_PATH)
+    templates_root = os.path.abspath(TEMPLATES_PATH)
+    parashiyot = set()
+    full = static = False
+
+    for path in changed:
+        path = os.path.abspath(path)
+        if path.startswith(templates_root + os.sep):
+            full = True
+        elif path.startswith(static_root + os.sep):
+            static = True
+        else:
+            parts = os.path.relpath(path, VAULT_PATH).split(os.sep)
+            if parts[0] == ".obsidian" or len(parts) < 3:
+                full = True  # Sort order or vault structure changed
+            elif (parts[1] not in context.books.get(parts[0], ()) or
+                  not os.path.isdir(os.path.join(VAULT_PATH, parts[0], parts[1]))):
+                full = True  # Parasha added or removed: the navigation changes
+            else:
+                parashiyot.add((parts[0], parts[1]))
+
+    if static:
+        copy_static_files(incremental=True)
+    if full:
+        generate_html(incremental=True)
+        context = BuildContext()
+        manifest.clear()
+        manifest.update(load_build_manifest())
+        return context
+
+    for book, parasha in sorted(parashiyot):
+        pages = rebuild_parasha(context, book, parasha, manifest)
+        logger.info("🔁 Rebuilt %s", ", ".join(pages) or parasha)
+    save_build_manifest(manifest)
+    return context
+
+def watch_and_serve(port=8000, interval=0.1, max_interval=2.0):
+    """Build once, serve OUTPUT_PATH on localhost and rebuild affected pages whenever a source changes.
+
+    Changes come from watchdog when it is installed, otherwise from polling (see poll_changes).
+    """
+    generate_html(incremental=True)
+    context = BuildContext()
+    manifest = load_build_manifest()
+
+    PreviewHandler.version = BuildVersion()
+    handler = partial(PreviewHandler, directory=OUTPUT_PATH)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("👀 Serving %s on http://127.0.0.1:%s/ and watching for changes (Ctrl+C to stop)", OUTPUT_PATH, port)
+    if Observer is None:
+        logger.info("⏱ watchdog not installed, polling the sources every %s-%s s", interval, max_interval)
+        changes = poll_changes(interval, max_interval)
+    else:
+        changes = observe_changes(interval)
+
+    try:
+        for changed in changes:
+            start = time.time()
+            context = apply_changes(changed, context, manifest)
+            PreviewHandler.version.bump()
+            logger.info("⚡ Rebuilt in %.0f ms", (time.time() - start) * 1000)
+    except KeyboardInterrupt:
+        changes.close()
+        server.shutdown()
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from collections import Counter
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+_active = None  # The BuildProfile being recorded, if --profile was given
+
+class BuildProfile:
+    """Wall time per phase, timings per page and counters of one build and/or upload."""
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.phases = Counter()
+        self.counts = Counter()
+        self.pages = {}
+        self.lock = threading.Lock()  # Counted from the upload threads too
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] += time.perf_counter() - start
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+    def report(self, top=10):
+        """Machine-readable report; slowest_pages lists the `top` slowest pages."""
+        slowest = sorted(self.pages.items(), key=lambda item: item[1]["seconds"], reverse=True)[:top]
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "total_seconds": time.perf_counter() - self.start,
+            "phases": dict(self.phases),
+            "counts": dict(self.counts),
+            "slowest_pages": [dict(page=page, **stats) for page, stats in slowest],
+            "pages": self.pages,
+        }
+
+def start_profile():
+    """Start recording phases, counters and page timings."""
+    global _active
+    _active = BuildProfile()
+    return _active
+
+def stop_profile(top=10):
+    """Stop recording and return the report, or None if no profile was running."""
+    global _active
+    profile, _active = _active, None
+    return profile.report(top) if profile else None
+
+def profiling():
+    """Whether a profile is being recorded (to skip work only the report needs)."""
+    return _active is not None
+
+def phase(name):
+    """Context manager timing a phase; free when not profiling."""
+    return _active.phase(name) if _active else nullcontext()
+
+def count(name, n=1):
+    """Add to a counter of the running profile."""
+    if _active:
+        _active.count(name, n)
+
+def add_phase(name, seconds):
+    """Add time measured elsewhere (e.g. summed over worker processes) to a phase."""
+    if _active:
+        with _active.lock:
+            _active.phases[name] += seconds
+
+def record_pages(pages):
+    """Add per-page stats ({page: {"seconds": ..., ...}}) measured by the renderer."""
+    if _active:
+        _active.pages.update(pages)
+
+def write_report(report, path):
+    """Save a profile report as JSON and log its summary."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    logger.info("⏱ Profile (%.2fs) written to %s", report["total_seconds"], path)
+    for name, seconds in sorted(report["phases"].items(), key=lambda item: item[1], reverse=True):
+        logger.info("   %-28s %9.1f ms", name, seconds * 1000)
+    for name, value in sorted(report["counts"].items()):
+        logger.info("   %-28s %9s", name, value)
+    if report["slowest_pages"]:
+        logger.info("🐢 Slowest pages:")
+        for stats in report["slowest_pages"]:
+            logger.info("   %9.1f ms  %s", stats["seconds"] * 1000, stats["page"])
+
+def default_report_path():
+    """Where --profile writes its report when no file is given."""
+    return os.path.join(".cache", "profiles", f"profile-{datetime.now():%Y%m%d-%H%M%S}.json")
+
+@contextmanager
+def profile_run(report_path=None, cprofile_path=None, top=10):
+    """Profile the enclosed build/upload: a JSON report at report_path and/or a cProfile dump at cprofile_path."""
+    if report_path:
+        start_profile()
+    profiler = cProfile.Profile() if cprofile_path else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(os.path.dirname(cprofile_path) or ".", exist_ok=True)
+            profiler.dump_stats(cprofile_path)
+            logger.info("⏱ cProfile stats written to %s (open with python -m pstats)", cprofile_path)
+        if report_path:
+            write_report(stop_profile(top), report_path)
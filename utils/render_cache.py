@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import config
+
+logger = logging.getLogger(__name__)
+
+# Rendered fragments persist here between builds; RENDER_CACHE=off disables the cache
+CACHE_PATH = os.environ.get("RENDER_CACHE", os.path.join(os.path.dirname(__file__), "..", ".cache", "render.sqlite"))
+MAX_BYTES = int(getattr(config, "RENDER_CACHE_MB", 64)) * 1024 * 1024
+BATCH = 500  # Keys per query, well below SQLite's variable limit
+TOUCH_AFTER = 3600  # Seconds before a hit refreshes its last-used time
+
+enabled = CACHE_PATH.lower() != "off"
+hits = misses = 0
+
+_db = None
+_db_pid = None
+
+def connect():
+    """Return this process's connection (worker processes open their own), or None if the cache is unusable."""
+    global _db, _db_pid, enabled
+    if _db is not None and _db_pid == os.getpid():
+        return _db
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(CACHE_PATH)), exist_ok=True)
+        db = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS fragments "
+                   "(key TEXT PRIMARY KEY, html TEXT NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS fragments_used ON fragments (used)")
+    except sqlite3.Error as e:
+        logger.warning("⚠ Render cache unavailable (%s), rendering everything", e)
+        enabled = False
+        return None
+    _db, _db_pid = db, os.getpid()
+    return db
+
+def use(path):
+    """Switch to another cache file (the benchmark keeps its own next to its synthetic vault)."""
+    global CACHE_PATH, enabled, _db
+    if _db is not None and _db_pid == os.getpid():
+        _db.close()
+    CACHE_PATH, enabled, _db = path, path.lower() != "off", None
+
+def clear():
+    """Drop every cached fragment."""
+    db = connect() if enabled else None
+    if db is not None:
+        db.execute("DELETE FROM fragments")
+
+def fragment_key(version, text):
+    """Content address of a fragment: the renderer version and the exact input text."""
+    return hashlib.sha1(f"{version}\0{text}".encode("utf-8")).hexdigest()
+
+def render_many(texts, render, version):
+    """Return [render(text) for text in texts], answering what it can from the cache.
+
+    version must change whenever render() could produce different HTML for the same
+    text; entries of other versions are never returned and age out of the cache.
+    """
+    global hits, misses, enabled
+    db = connect() if enabled else None
+    if db is None:
+        return [render(text) for text in texts]
+
+    keys = [fragment_key(version, text) for text in texts]
+    now = int(time.time())
+    found = {}
+    try:
+        for i in range(0, len(keys), BATCH):
+            batch = keys[i:i + BATCH]
+            marks = ",".join("?" * len(batch))
+            found.update(db.execute(f"SELECT key, html FROM fragments WHERE key IN ({marks})", batch))
+            db.execute(f"UPDATE fragments SET used = ? WHERE key IN ({marks}) AND used < ?",
+                       [now] + batch + [now - TOUCH_AFTER])
+
+        new = []
+        for key, text in zip(keys, texts):
+            if key not in found:
+                found[key] = render(text)
+                new.append((key, found[key], len(found[key].encode("utf-8")), now))
+        if new:
+            db.executemany("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?)", new)
+    except sqlite3.Error as e:
+        logger.warning("⚠ Render cache failed (%s), rendering everything", e)
+        enabled = False
+        return [render(text) for text in texts]
+
+    hits += len(keys) - len(new)
+    misses += len(new)
+    return [found[key] for key in keys]
+
+def prune(max_bytes=MAX_BYTES):
+    """Evict the least recently used fragments until the cache holds at most max_bytes of HTML."""
+    db = connect() if enabled else None
+    if db is None:
+        return 0
+    try:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        evict = []
+        for key, size in db.execute("SELECT key, size FROM fragments ORDER BY used"):
+            if total <= max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        db.executemany("DELETE FROM fragments WHERE key = ?", evict)
+    except sqlite3.Error as e:
+        logger.warning("⚠ Render cache not pruned (%s)", e)
+        return 0
+    logger.debug("🧹 Render cache: evicted %s fragments", len(evict))
+    return len(evict)
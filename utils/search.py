@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from utils.file_utils import strip_links
+from utils.assets import write_if_changed, write_compressed_siblings, remove_stale_output
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DIR = "search"  # Output subfolder shared by all language sites
+
+# Added above the navigation when search is enabled; static/script.js wires it up
+SEARCH_BOX = (
+    f'<form id="search" data-index="/{SEARCH_DIR}/index.json" onsubmit="return false">'
+    '<input type="search" id="search-input" placeholder="🔍" autocomplete="off"></form>'
+    '<ul id="search-results"></ul>'
+)
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+def normalize(text):
+    """Lowercase and drop combining marks: Latin accents as well as niqqud and cantillation."""
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn").lower()
+
+def tokenize(markdown_text):
+    """Searchable words of a piece of Markdown (link targets and markup left out)."""
+    # The maqaf joins Hebrew words; it isn't a letter, so it already splits them
+    return WORD_RE.findall(normalize(strip_links(markdown_text)))
+
+class SearchShard:
+    """Inverted index of one book: pages, documents (verses and commentaries) and term postings."""
+
+    def __init__(self, book):
+        self.book = book
+        self.pages = []
+        self.page_ids = {}
+        self.docs = []
+        self.doc_ids = {}
+        self.terms = {}
+
+    def add(self, page, title, anchor, text, sites=None):
+        """Index text under a document: a (chapter, verse) or commentary id anchor on a page.
+
+        sites lists the site folders whose page shows a commentary; other sites leave it out of their results.
+        """
+        words = tokenize(text)
+        if not words:
+            return
+        if page not in self.page_ids:
+            self.page_ids[page] = len(self.pages)
+            self.pages.append([page, title])
+        key = (page, anchor)
+        if key not in self.doc_ids:
+            self.doc_ids[key] = len(self.docs)
+            # [page, chapter, verse] or [page, commentary id, [site folders]]
+            self.docs.append([self.page_ids[page]] + (list(anchor) if isinstance(anchor, tuple) else [anchor, sites]))
+        doc = self.doc_ids[key]
+        for word in words:
+            postings = self.terms.setdefault(word, [])
+            if not postings or postings[-1] != doc:
+                postings.append(doc)
+
+    def to_json(self):
+        """Compact JSON: postings are sorted document numbers stored as deltas."""
+        terms = {}
+        for word in sorted(self.terms):
+            docs = sorted(set(self.terms[word]))
+            terms[word] = [doc - previous for doc, previous in zip(docs, [0] + docs)]
+        return json.dumps({"book": self.book, "pages": self.pages, "docs": self.docs, "terms": terms},
+                          ensure_ascii=False, separators=(",", ":"))
+
+def write_search_index(output_path, shards, precompress=False):
+    """Write the fingerprinted shards and their index.json, removing shards no longer referenced.
+
+    Unchanged shards keep their file (and name), so browsers and the FTP sync reuse them.
+    """
+    out_dir = os.path.join(output_path, SEARCH_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    index = []
+    written = 0
+
+    for slug, shard in shards:
+        data = shard.to_json().encode("utf-8")
+        name = f"{slug}.{hashlib.sha1(data).hexdigest()[:8]}.json"
+        path = os.path.join(out_dir, name)
+        if write_if_changed(path, data):
+            written += 1
+        if precompress:
+            write_compressed_siblings(path, data)
+        # The pages let the client search the book it is on first and fetch other shards on demand
+        index.append({"book": shard.book, "file": name, "docs": len(shard.docs),
+                      "pages": [page for page, _ in shard.pages]})
+
+    data = json.dumps({"shards": index}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    path = os.path.join(out_dir, "index.json")
+    write_if_changed(path, data)
+    if precompress:
+        write_compressed_siblings(path, data)
+
+    remove_stale_output(out_dir, {entry["file"] for entry in index} | {"index.json"}, precompress)
+
+    logger.info("🔎 Search index written (%s shards, %s changed).", len(index), written)
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+SEFARIA_API = "https://www.sefaria.org/api/texts/"
+
+# Cached responses live here; point SEFARIA_CACHE at recorded fixtures to run without network
+CACHE_PATH = os.environ.get("SEFARIA_CACHE", os.path.join(os.path.dirname(__file__), "..", ".cache", "sefaria"))
+
+_session = None
+
+class SefariaError(Exception):
+    """A text neither Sefaria nor the cache can provide."""
+
+def offline_mode():
+    """SEFARIA_OFFLINE=1 never touches the network and only answers from the cache."""
+    return os.environ.get("SEFARIA_OFFLINE", "") not in ("", "0")
+
+def get_session(pool_size=8):
+    """One pooled HTTP session (keep-alive, retries with backoff) shared by all requests."""
+    global _session
+    if _session is None:
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        _session = requests.Session()
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+def text_url(ref, params=None):
+    """Canonical API URL of a ref; the query is sorted so equal requests share a cache entry."""
+    query = urlencode(sorted((params or {}).items()))
+    return f"{SEFARIA_API}{ref}" + (f"?{query}" if query else "")
+
+def cache_file(url):
+    """Cache file of an API URL."""
+    return os.path.join(CACHE_PATH, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+def fetch_text(ref, params=None, offline=None):
+    """Return the Sefaria API JSON for a ref (and version/params), using the on-disk cache.
+
+    Cached entries are revalidated with ETag/Last-Modified, so an unchanged text costs
+    a 304 with no body. When the network fails, a cached copy is used if there is one.
+    Raises SefariaError when there is neither.
+    """
+    offline = offline_mode() if offline is None else offline
+    url = text_url(ref, params)
+    path = cache_file(url)
+
+    cached = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if offline:
+        if cached is None:
+            raise SefariaError(f"{ref} is not in the Sefaria cache (offline mode)")
+        return cached["data"]
+
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=30)
+    except requests.RequestException as e:
+        if cached is None:
+            raise
+        logger.warning("⚠ Sefaria unreachable (%s), using cached %s", e, ref)
+        return cached["data"]
+
+    if response.status_code == 304 and cached is not None:
+        return cached["data"]
+    if not response.ok:
+        if cached is not None:
+            logger.warning("⚠ Sefaria returned %s for %s, using cached copy", response.status_code, ref)
+            return cached["data"]
+        raise SefariaError(f"Failed to retrieve data from Sefaria API for {ref} ({response.status_code})")
+
+    data = response.json()
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    # Swapped in whole, so an interrupted fetch never leaves a truncated entry behind
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "data": data,
+        }, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return data
+
+def fetch_chapters(book, chapters, params=None, workers=8, offline=None):
+    """Fetch several chapters of a book concurrently over the pooled session; results keep the chapters' order."""
+    get_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda chapter: fetch_text(f"{book}.{chapter}", params, offline), chapters))
@@ -1,11 +1,26 @@
 import os
 import shutil
-from utils.file_utils import read_markdown_file, markdown_to_html, remove_cssclasses
+from utils import file_utils, commentaries, assets, search, profiling, render_cache, corpus
+from utils.file_utils import read_markdown_file, markdown_lines_to_html, file_hash, text_hash
+from utils.commentaries import load_commentary, find_broken_commentary_links
+from utils.assets import build_static_assets, rewrite_asset_urls, write_output, write_output_if_changed, remove_output, OutputWriter
+from utils.search import SearchShard, SEARCH_BOX, SEARCH_DIR, write_search_index
+from utils.corpus import compile_books, remove_stale_books, open_book
+from utils.api import API_DIR, write_api
+from utils.commentaries import resolve_links
+from utils.backlinks import build_reference_index, scan_vault_commentaries, verse_references
+import config
 from config import VAULT_PATH, OUTPUT_PATH
 import re
 import unicodedata
 import json
+import time
+import string
+import logging
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import quote
 
 SEFARIA_BOOK_MAP = {
     "1 Berésit": "Genesis",
@@ -15,21 +30,101 @@ SEFARIA_BOOK_MAP = {
     "5 Devárim": "Deuteronomy"
 }
 
+# (source language, translation, output subfolder) of every site that gets built
+LANGUAGE_SITES = tuple(getattr(config, "LANGUAGE_SITES", (("HE", "EN", ""), ("HE", "HU", "hu"))))
+
+# Sends deep links into another chapter of a split page (split_chapters) on to that chapter's file
+CHAPTER_REDIRECT = """
+        (function () {
+            const id = decodeURIComponent(location.hash.slice(1));
+            const chapter = /^ch(\\d+)-vrs/.exec(id);
+            const page = chapter ? chapterPages.chapters[chapter[1]] : chapterPages.commentaries[id];
+            if (page && page !== chapterPages.current) location.replace(page + location.hash);
+        })();
+    """
+
+BUILD_MANIFEST = ".build-manifest.json"  # Stored in OUTPUT_PATH, never uploaded
+STATIC_PATH = os.path.join(os.path.dirname(__file__), "..", "static")
+
+logger = logging.getLogger(__name__)
+
 def remove_accents(text):
     """Convert accented characters to their non-accented equivalents."""
     normalized = unicodedata.normalize('NFD', text)  # Decomposes accents
     return re.sub(r'[\u0300-\u036f]', '', normalized)  # Removes diacritic marks
 
-def copy_static_files():
+def book_slug(name):
+    """ASCII slug of a book or parasha name, used in search shard and API file names."""
+    return re.sub(r"[^a-z0-9]+", "-", remove_accents(name).lower()).strip("-")
+
+@lru_cache(maxsize=None)
+def parasha_filename(parasha):
+    """Output file name (slug) of a parasha page."""
+    return remove_accents(parasha) + ".html"
+
+def copy_static_files(incremental=False):
     """Copy static assets (CSS, JS) to the output folder"""
-    static_src = os.path.join(os.path.dirname(__file__), "..", "static")  # Path to static folder
+    static_src = STATIC_PATH  # Path to static folder
     static_dst = os.path.join(OUTPUT_PATH, "static")  # Destination in output
 
+    if incremental and os.path.exists(static_dst):
+        # Only touch assets whose content changed, so their mtimes stay put for the FTP sync
+        copied = 0
+        for item in os.listdir(static_src):
+            src = os.path.join(static_src, item)
+            dst = os.path.join(static_dst, item)
+            if os.path.isfile(src) and file_hash(src) != file_hash(dst):
+                shutil.copy2(src, dst)
+                copied += 1
+        # Drop what an --optimize-assets build left: fingerprinted files and their .gz/.br siblings
+        removed = 0
+        for item in os.listdir(static_dst):
+            dst = os.path.join(static_dst, item)
+            if os.path.isfile(dst) and not os.path.exists(os.path.join(static_src, item)):
+                os.remove(dst)
+                removed += 1
+        logger.info("✅ Static assets synced (%s changed, %s removed).", copied, removed)
+        return
+
     if os.path.exists(static_dst):
         shutil.rmtree(static_dst)  # Remove old static files
 
     shutil.copytree(static_src, static_dst)  # Copy entire static directory
-    print("✅ Static assets copied.")
+    logger.info("✅ Static assets copied.")
+
+def load_build_manifest():
+    """Load the manifest of input hashes from the previous build, or an empty one."""
+    try:
+        with open(os.path.join(OUTPUT_PATH, BUILD_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_build_manifest(manifest):
+    """Write the manifest of input hashes for the pages just built."""
+    with open(os.path.join(OUTPUT_PATH, BUILD_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def generator_hash():
+    """Hash of the generator code itself, so changing the renderer invalidates every page."""
+    modules = (__file__, file_utils.__file__, commentaries.__file__, assets.__file__, search.__file__, corpus.__file__)
+    return text_hash("".join(file_hash(path) or "" for path in modules))
+
+def vault_key(path):
+    """Manifest key for a file inside the vault."""
+    return os.path.relpath(path, VAULT_PATH)
+
+def page_is_current(manifest, page, out_file, inputs):
+    """Check whether a page exists and its recorded inputs (incl. commentaries) are unchanged."""
+    previous = manifest.get(page)
+    if not previous or not os.path.exists(out_file):
+        return False
+
+    current = dict(inputs)
+    for key in previous:
+        if key not in current:  # Commentary files discovered while rendering last time
+            current[key] = file_hash(os.path.join(VAULT_PATH, key))
+    return current == previous
 
 def load_custom_sort():
     """Load the custom sort order from bookmarks.json."""
@@ -39,7 +134,7 @@ def load_custom_sort():
         
         sortspec = next((item for item in data["items"] if item.get("title") == "sortspec"), None)
         if not sortspec:
-            print("⚠ Custom sort order not found, using default alphabetical order.")
+            logger.warning("⚠ Custom sort order not found, using default alphabetical order.")
             return None
 
         book_order = {}
@@ -51,19 +146,26 @@ def load_custom_sort():
         return book_order
 
     except Exception as e:
-        print(f"⚠ Error loading bookmarks.json: {e}")
+        logger.warning("⚠ Error loading bookmarks.json: %s", e)
         return None
 
-def generate_nav_structure():
+def load_vault_tree():
+    """List the books of the vault (alphabetically) with their sorted contents."""
+    return {
+        book: sorted(os.listdir(os.path.join(VAULT_PATH, book)))
+        for book in sorted(os.listdir(VAULT_PATH))
+        if not book.startswith(".") and os.path.isdir(os.path.join(VAULT_PATH, book))
+    }
+
+def generate_nav_structure(custom_order=None, books_in_vault=None):
     """Generate the navigation HTML using the custom order where available, falling back to alphabetical otherwise."""
-    custom_order = load_custom_sort()
+    if custom_order is None:
+        custom_order = load_custom_sort() or {}
     nav_html = "<ul>"
 
     # Get the actual books and parashiyot from the vault
-    books_in_vault = {
-        book: sorted(os.listdir(os.path.join(VAULT_PATH, book))) 
-        for book in os.listdir(VAULT_PATH) if not book.startswith(".")
-    }
+    if books_in_vault is None:
+        books_in_vault = load_vault_tree()
 
     # Process books (custom order first, then add missing books)
     processed_books = set()
@@ -76,15 +178,13 @@ def generate_nav_structure():
             processed_parashiyot = set()
             for parasha in parashiyot:
                 if parasha in books_in_vault[book]:
-                    parasha_filename = remove_accents(parasha) + ".html"
-                    nav_html += f'<li><a href="{parasha_filename}">{parasha}</a></li>'
+                    nav_html += f'<li><a href="{parasha_filename(parasha)}">{parasha}</a></li>'
                     processed_parashiyot.add(parasha)
 
             # Add any missing parashiyot in alphabetical order
             for parasha in sorted(books_in_vault[book]):
                 if parasha not in processed_parashiyot:
-                    parasha_filename = remove_accents(parasha) + ".html"
-                    nav_html += f'<li><a href="{parasha_filename}">{parasha}</a></li>'
+                    nav_html += f'<li><a href="{parasha_filename(parasha)}">{parasha}</a></li>'
 
             nav_html += "</ul></li>"
 
@@ -93,53 +193,404 @@ def generate_nav_structure():
         if book not in processed_books:
             nav_html += f"<li>{book}<ul>"
             for parasha in sorted(books_in_vault[book]):
-                parasha_filename = remove_accents(parasha) + ".html"
-                nav_html += f'<li><a href="{parasha_filename}">{parasha}</a></li>'
+                nav_html += f'<li><a href="{parasha_filename(parasha)}">{parasha}</a></li>'
             nav_html += "</ul></li>"
 
     nav_html += "</ul>"
     return nav_html
 
-def extract_chapter_verse_en(line, current_chapter, current_verse):
-    """Extracts chapter and verse numbers from a line in HU.md"""
-    chapter_match = re.match(r"# Chapter (\d+)", line)
-    verse_match = re.match(r"\*\*(\d+)\.\*\*", line)
-
-    if chapter_match:
-        return int(chapter_match.group(1)), 0  # Reset verse when chapter changes
-    elif verse_match:
-        return current_chapter, int(verse_match.group(1))
-    
-    return current_chapter, current_verse  # Keep last known values
-
-def extract_chapter_verse_hu(line, current_chapter, current_verse):
-    """Extracts chapter and verse numbers from a line in HU.md"""
-    chapter_match = re.match(r"# (\d+)\. fejezet", line)
-    verse_match = re.match(r"\*\*(\d+)\.\*\*", line)
-
-    if chapter_match:
-        return int(chapter_match.group(1)), 0  # Reset verse when chapter changes
-    elif verse_match:
-        return current_chapter, int(verse_match.group(1))
-    
-    return current_chapter, current_verse  # Keep last known values
-
-def generate_bilingual_html(lang1, lang2, output_subdir=""):
-    """Generate bilingual HTML pages for two languages and save them under the specified subdirectory."""
-    out_path = os.path.join(OUTPUT_PATH, output_subdir)
-    os.makedirs(out_path, exist_ok=True)
-
-    nav_html = generate_nav_structure()
-
-    for book in sorted(os.listdir(VAULT_PATH)):
-        if book.startswith("."):
-            continue
-
+class BuildContext:
+    """Vault tree, sort order, navigation and templates, loaded once per build and shared by every page.
+
+    With shared_nav=True the pages don't inline the navigation; each site folder gets
+    a nav.js that injects it, so browsers and the CDN cache it once for all pages.
+    assets maps static file names to their fingerprinted names (see build_static_assets),
+    precompress writes .gz/.br siblings next to every page and search adds the search box.
+    With lazy_commentary=True a page's commentaries go to a JSON bundle next to it,
+    fetched by static/script.js when the first one is opened.
+    With backlinks=True every commentary lists the verses linking to it, from any
+    parasha; plan_pages() fills references with the reverse index (see utils/backlinks.py).
+    split_chapters=True writes every chapter of a parasha to a page of its own, so a
+    page only takes one chapter to parse and paint.
+    """
+
+    def __init__(self, shared_nav=False, assets=None, precompress=False, search=False, lazy_commentary=False,
+                 backlinks=False, split_chapters=False):
+        self.shared_nav = shared_nav
+        self.precompress = precompress
+        self.lazy_commentary = lazy_commentary
+        self.backlinks = backlinks
+        self.split_chapters = split_chapters
+        self.references = None
+        self.custom_order = load_custom_sort() or {}
+        self.books = load_vault_tree()
+        self.nav_html = generate_nav_structure(self.custom_order, self.books)
+        if search:
+            self.nav_html = SEARCH_BOX + self.nav_html
+        self.templates = {}
+        for name in ("parasha", "index"):
+            with open(f"templates/{name}.html", "r", encoding="utf-8") as f:
+                self.templates[name] = f.read()
+            if assets:
+                self.templates[name] = rewrite_asset_urls(self.templates[name], assets)
+
+        # The parasha template is split once; pages are streamed through the chunks
+        self.page_chunks = split_template(self.templates["parasha"])
+        fields = [field for _, field in self.page_chunks if field is not None]
+        self.commentary_after_table = (
+            "commentary" not in fields or "bilingual_content" not in fields or
+            fields.index("commentary") > fields.index("bilingual_content")
+        )
+
+        nav_hash = text_hash(self.nav_html)
+        if shared_nav:
+            # Versioned URL, so the fragment can be cached until the navigation changes
+            self.nav_structure = f'<script src="nav.js?v={nav_hash[:10]}"></script>'
+        else:
+            self.nav_structure = self.nav_html
+
+        self.hashes = {
+            "#generator": generator_hash(),
+            "#nav": text_hash(self.nav_structure),  # What the pages actually embed
+            "#nav-script": nav_hash,
+            "#template": text_hash(self.templates["parasha"]),
+            "#index-template": text_hash(self.templates["index"]),
+            "#commentary": "lazy" if lazy_commentary else "inline",
+        }
+
+    def nav_script(self):
+        """JavaScript that inserts the navigation where its <script> tag stands."""
+        return f"document.currentScript.insertAdjacentHTML('beforebegin', {json.dumps(self.nav_html)});\n"
+
+def write_template(out, chunks, fields):
+    """Write a template split by split_template(), streaming fields that are iterables of strings."""
+    for literal, field in chunks:
+        out.write(literal)
+        if field is not None:
+            value = fields[field]
+            if isinstance(value, str):
+                out.write(value)
+            else:
+                for piece in value:
+                    out.write(piece)
+
+def split_template(template):
+    """Split a str.format template once into (literal text, field name) chunks."""
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+def corpus_sites(sites):
+    """Sites the corpus is compiled for: the configured ones plus any others being built."""
+    configured = tuple(tuple(site) for site in LANGUAGE_SITES)
+    return configured + tuple(tuple(site) for site in sites if tuple(site) not in configured)
+
+def load_parasha_source(book_corpus, parasha, lang):
+    """One language of a parasha from the compiled corpus: (markdown lines, (chapter, verse) after each line,
+    rendered HTML of each line, commentary ids linked from each line)."""
+    lines = book_corpus.lines(parasha, lang)
+    return (lines, book_corpus.line_positions(parasha, lang), markdown_lines_to_html(lines),
+            book_corpus.line_links(parasha, lang))
+
+def link_verses(html, book, chapter, verse):
+    """Turn the **{n}** verse markers of a line into anchors, numbered from verse on.
+
+    Returns the linked HTML and the verse number following the last marker.
+    """
+    current_verse = verse  # Save a local verse counter
+
+    # Define a replacement function that updates the verse each time
+    def replace_strong_with_link(match):
+        nonlocal current_verse
+        verse_id = f"ch{chapter}-vrs{current_verse}"
+        text_inside = match.group(1)
+        sefaria_book = SEFARIA_BOOK_MAP.get(book, None)
+        if sefaria_book:
+            #sefaria_link = f"https://www.sefaria.org/{sefaria_book}.{chapter}.{current_verse}?lang=bi&with=all&lang2=en"
+            result = (
+                f"<a id='{verse_id}' href='#{verse_id}' onclick=\"showSefariaLink({chapter}, {current_verse}, '{sefaria_book}')\">"
+                f"<strong>{text_inside}</strong></a>"
+            )
+        else:
+            result=f"<a id='{verse_id}' href='#{verse_id}'\"><strong>{text_inside}</strong></a>"
+        current_verse += 1  # Increment after each replacement
+        return result
+
+    html = re.sub(r"<strong>\{(.*?)\}</strong>", replace_strong_with_link, html)
+    return html, current_verse
+
+def render_parasha(job):
+    """Render the pages of one parasha in every language site that needs them.
+
+    Takes a single job tuple so it can be mapped over a process pool. Each language
+    is read once from the compiled corpus and the anchored base-language lines are
+    shared by all translations that agree on the verse numbering.
+
+    Returns ({page: inputs}, stats) where stats holds the Markdown parsing time,
+    render cache hits and misses, and per-page timings and counts for the build profile.
+    """
+    book, parasha, parasha_path, commentary_index, context, pages = job
+    sources = {}
+    anchored = {}
+    results = {}
+    stats = {"markdown": 0.0, "pages": {}}
+    cache_hits, cache_misses = render_cache.hits, render_cache.misses
+    book_corpus = open_book(VAULT_PATH, book)
+    for page, lang1, lang2, out_file, inputs in pages:
+        start = time.perf_counter()
+        for lang in (lang1, lang2):
+            if lang not in sources:
+                sources[lang] = load_parasha_source(book_corpus, parasha, lang)
+        parsed = time.perf_counter()
+        results[page] = render_parasha_page(lang1, lang2, book, parasha, parasha_path, commentary_index,
+                                            out_file, context, inputs, sources, anchored, results)
+        linked = [digest for key, digest in results[page].items() if key not in inputs]
+        stats["markdown"] += parsed - start
+        stats["pages"][page] = {
+            "seconds": time.perf_counter() - start,
+            "lines": min(len(sources[lang1][0]), len(sources[lang2][0])),
+            "commentaries": sum(digest is not None for digest in linked),
+            "missing_commentaries": sum(digest is None for digest in linked),
+        }
+    stats["render_cache_hits"] = render_cache.hits - cache_hits
+    stats["render_cache_misses"] = render_cache.misses - cache_misses
+    return results, stats
+
+def render_parasha_page(lang1, lang2, book, parasha, parasha_path, commentary_index, out_file, context, inputs,
+                        sources=None, anchored=None, extra_pages=None):
+    """Render one bilingual parasha page and return the inputs it was built from.
+
+    sources and anchored are render_parasha()'s per-parasha caches of parsed language
+    files and verse-linked lines, so a whole parasha's lines and their HTML are held in
+    memory while its pages render. The page itself is never joined into one string:
+    table rows and commentaries are written to the output file as they are produced.
+    With context.split_chapters every chapter after the first goes to a file of its
+    own, whose manifest entry is added to extra_pages.
+    """
+    if sources is None:
+        book_corpus = open_book(VAULT_PATH, book)
+        sources = {lang: load_parasha_source(book_corpus, parasha, lang) for lang in (lang1, lang2)}
+    if anchored is None:
+        anchored = {}
+    inputs = dict(inputs)
+    backlinks = None
+    if context.references is not None:
+        backlinks = page_backlinks(context.references, commentary_index, lang1, lang2)
+
+    # zip() keeps only the aligned lines
+    lang1_html = sources[lang1][2]
+    _, lang2_positions, lang2_html, lang2_links = sources[lang2]
+    rows = list(zip(lang2_positions, lang1_html, lang2_html, lang2_links))
+
+    # (file, first row, end row, extra <head> tags, chapter links) of every file the page is written to
+    parts = [(out_file, 0, len(rows), "", "")]
+    chapters = chapter_parts([position for position, *_ in rows]) if context.split_chapters else []
+    if len(chapters) > 1:
+        parts = split_parts(out_file, chapters, rows)
+        page = os.path.relpath(out_file, OUTPUT_PATH)
+        for part_file, *_ in parts[1:]:
+            if extra_pages is not None:
+                extra_pages[os.path.relpath(part_file, OUTPUT_PATH)] = {"#chapter-of": page}
+    chapter_pages = {chapter: os.path.basename(part[0]) for (chapter, _, _), part in zip(chapters, parts)}
+
+    def table_rows(commentaries, first, end, current_file):
+        for index in range(first, end):
+            (chapter, verse), l1_html, l2_html, links = rows[index]
+            # Apply replacement for l1 and l2; l2 continues numbering where l1 stopped
+            key = (lang1, index, chapter, verse)
+            if key not in anchored:
+                anchored[key] = link_verses(l1_html, book, chapter, verse)
+            l1_html, current_verse = anchored[key]
+            l2_html, _ = link_verses(l2_html, book, chapter, current_verse)
+
+            # Commentary links are taken from lang2 (e.g., HU or EN), as the corpus found them
+            for match in links:
+                if match not in commentaries:
+                    if match not in commentary_index:
+                        # Recorded anyway, so creating the file later rebuilds the page
+                        inputs[vault_key(os.path.join(parasha_path, "perusim", f"{match}.md"))] = None
+                        continue
+                    comment_path, mtime = commentary_index[match]
+                    inputs[vault_key(comment_path)], comment_text = load_commentary(comment_path, mtime)
+                    if backlinks and match in backlinks:
+                        comment_text += backlinks_html(backlinks[match], book, parasha, lang1, lang2,
+                                                       chapter_pages, os.path.basename(current_file))
+                    commentaries[match] = comment_text
+
+            yield f"<tr><td class='{lang1.lower()}'>{l1_html}</td><td class='{lang2.lower()} chapter-heading'>{l2_html}</td></tr>\n"
+
+    def bilingual_table(commentaries, first, end, current_file, chapter_links):
+        yield """
+            <table class="bilingual-table">
+                <tbody>
+                    """
+        yield from table_rows(commentaries, first, end, current_file)
+        yield """
+                </tbody>
+            </table>
+            """
+        yield chapter_links
+
+    def commentary_blocks(commentaries, current_file):
+        # Only complete once the table has been written
+        if context.lazy_commentary:
+            yield write_commentary_bundle(current_file, commentaries, context.precompress)
+            return
+        for cid, text in commentaries.items():
+            yield f'<div id="{cid}" class="commentary">{text}</div><hr>'
+
+    for current_file, first, end, head, chapter_links in parts:
+        commentaries = OrderedDict()
+        fields = {
+            "title": parasha,
+            "head": head,
+            "nav_structure": context.nav_structure,
+            "bilingual_content": bilingual_table(commentaries, first, end, current_file, chapter_links),
+            "commentary": commentary_blocks(commentaries, current_file),
+        }
+        if not context.commentary_after_table:
+            fields["bilingual_content"] = "".join(fields["bilingual_content"])
+
+        if not context.lazy_commentary:
+            remove_output(commentary_bundle_path(current_file))  # From an earlier lazy build
+
+        with OutputWriter(current_file, context.precompress) as out:
+            write_template(out, context.page_chunks, fields)
+    return inputs
+
+def chapter_parts(positions):
+    """Split a parasha's rows by chapter heading into [(chapter, first row, end row), ...].
+
+    Rows before the first heading belong to the first chapter.
+    """
+    chapters = []
+    for index, (chapter, _) in enumerate(positions):
+        if chapters and chapters[-1][0] in (0, chapter):
+            chapters[-1] = (chapter or chapters[-1][0], chapters[-1][1], index + 1)
+        else:
+            chapters.append((chapter, index, index + 1))
+    return chapters
+
+def chapter_filename(page_file, index, chapter):
+    """File of a parasha's chapter in split_chapters mode: the first one keeps the page's own name."""
+    if index == 0:
+        return page_file
+    return f"{os.path.splitext(page_file)[0]}.{chapter}.html"
+
+def split_parts(out_file, chapters, rows):
+    """Files, row ranges, <head> tags and chapter links of a page split into chapters.
+
+    Every part prefetches its neighbours and carries the chapter and commentary maps
+    that send deep links (Parasha.html#ch33-vrs1 or #commentary) on to the right part.
+    """
+    files = [chapter_filename(out_file, index, chapter) for index, (chapter, _, _) in enumerate(chapters)]
+    names = [os.path.basename(file) for file in files]
+    pages = {"chapters": {str(chapter): name for (chapter, _, _), name in zip(chapters, names)}, "commentaries": {}}
+    for (_, first, end), name in zip(chapters, names):
+        for *_, links in rows[first:end]:
+            for cid in links:
+                pages["commentaries"].setdefault(cid, name)
+
+    parts = []
+    for index, ((chapter, first, end), file) in enumerate(zip(chapters, files)):
+        neighbours = [(names[i], chapters[i][0], rel) for i, rel in ((index - 1, "prev"), (index + 1, "next"))
+                      if 0 <= i < len(chapters)]
+        head = "".join(f'\n    <link rel="prefetch" href="{name}">' for name, _, _ in neighbours)
+        data = json.dumps(dict(pages, current=names[index]), ensure_ascii=False).replace("</", "<\\/")
+        head += f"\n    <script>\n        const chapterPages = {data};{CHAPTER_REDIRECT}</script>"
+        links = "".join(f'<a href="{name}" rel="{rel}">{"‹ " if rel == "prev" else ""}{number}{" ›" if rel == "next" else ""}</a>'
+                        for name, number, rel in neighbours)
+        parts.append((file, first, end, head, f'<p class="chapter-nav">{links}</p>\n'))
+    return parts
+
+def page_backlinks(references, commentary_index, lang1, lang2):
+    """{commentary id: [(book, parasha, chapter, verse), ...]} of a page's commentaries, cited from either language."""
+    backlinks = {}
+    for cid, (path, _) in commentary_index.items():
+        verses = verse_references(references.get(path, ()), (lang1, lang2))
+        if verses:
+            backlinks[cid] = verses
+    return backlinks
+
+def backlinks_html(verses, book, parasha, lang1, lang2, chapter_pages=None, current_file=None):
+    """"Referenced from" line of a commentary, linking the verses on this page and on other parashiyot's pages of the site.
+
+    chapter_pages maps the chapters of a page split by split_chapters to their files.
+    """
+    links = []
+    for ref_book, ref_parasha, chapter, verse in verses:
+        anchor = f"#ch{chapter}-vrs{verse}"
+        if (ref_book, ref_parasha) == (book, parasha):
+            target = (chapter_pages or {}).get(chapter, current_file)
+            links.append(f'<a href="{"" if target == current_file else target}{anchor}">{chapter}:{verse}</a>')
+        elif open_book(VAULT_PATH, ref_book).has(ref_parasha, lang1, lang2):
+            links.append(f'<a href="{parasha_filename(ref_parasha)}{anchor}">{ref_parasha} {chapter}:{verse}</a>')
+    return f'<p class="backlinks">↩ {", ".join(links)}</p>' if links else ""
+
+def commentary_bundle_path(page_file):
+    """Commentary bundle written next to a page in lazy_commentary mode."""
+    return os.path.splitext(page_file)[0] + ".commentary.json"
+
+def write_commentary_bundle(out_file, commentaries, precompress=False):
+    """Write a page's commentaries as [[id, html], ...] and return the placeholder that loads them.
+
+    The versioned URL only changes with the bundle's content, so browsers keep using a
+    cached bundle across deploys until one of its commentaries is edited.
+    """
+    path = commentary_bundle_path(out_file)
+    if not commentaries:
+        remove_output(path)
+        return ""
+    bundle = json.dumps(list(commentaries.items()), ensure_ascii=False, separators=(",", ":"))
+    write_output_if_changed(path, bundle, precompress)
+    return f'<div id="commentary-bundle" data-src="{quote(os.path.basename(path))}?v={text_hash(bundle)[:10]}"></div>'
+
+def page_inputs(context, file1, file2):
+    """Build manifest inputs of a parasha page, before the commentaries it links to are known."""
+    inputs = {key: context.hashes[key] for key in ("#generator", "#nav", "#template", "#commentary")}
+    inputs[vault_key(file1)] = file_hash(file1)
+    inputs[vault_key(file2)] = file_hash(file2)
+    if context.split_chapters:
+        inputs["#layout"] = "chapters"
+    return inputs
+
+def plan_pages(manifest, new_manifest, commentary_indexes=None, context=None, sites=None):
+    """Walk the vault once and return one job per parasha with the pages of all sites that need rendering.
+
+    Books whose sources changed are compiled into the corpus first (see utils/corpus.py).
+    Unchanged pages are carried over into new_manifest; the cheap index pages are written right away.
+    Every parasha's perusim/ folder is scanned once into commentary_indexes, so links
+    can resolve to the commentaries of other parashiyot (see resolve_links).
+    Returns the job list, the number of pages to render and the number of pages skipped.
+    """
+    if commentary_indexes is None:
+        commentary_indexes = {}
+    if context is None:
+        context = BuildContext()
+    if sites is None:
+        sites = LANGUAGE_SITES
+    for _, _, output_subdir in sites:
+        os.makedirs(os.path.join(OUTPUT_PATH, output_subdir), exist_ok=True)
+    with profiling.phase("build: corpus"):
+        profiling.count("corpus_books_compiled", compile_books(VAULT_PATH, context.books, corpus_sites(sites)))
+        remove_stale_books(VAULT_PATH, context.books)
+    scanned = len(commentary_indexes)
+    unique = scan_vault_commentaries(VAULT_PATH, context.books, commentary_indexes)
+    profiling.count("perusim_scans", len(commentary_indexes) - scanned)
+    if context.backlinks:
+        with profiling.phase("build: reverse index"):
+            context.references = build_reference_index(VAULT_PATH, context.books, commentary_indexes)
+        profiling.count("commentaries_referenced", len(context.references))
+        profiling.count("commentaries_shared", sum(len(verse_references(refs)) > 1
+                                                   for refs in context.references.values()))
+    jobs = []
+    rendered = skipped = 0
+    chapter_pages = {}  # Files of the chapters split off each page, kept along with the page
+    for key, previous in manifest.items():
+        if "#chapter-of" in previous:
+            chapter_pages.setdefault(previous["#chapter-of"], []).append(key)
+
+    for book, parashiyot in context.books.items():
         book_path = os.path.join(VAULT_PATH, book)
-        if not os.path.isdir(book_path):
-            continue
-
-        for parasha in sorted(os.listdir(book_path)):
+        for parasha in parashiyot:
             if parasha.startswith("."):
                 continue
 
@@ -147,105 +598,289 @@ def generate_bilingual_html(lang1, lang2, output_subdir=""):
             if not os.path.isdir(parasha_path):
                 continue
 
-            file1 = os.path.join(parasha_path, f"{lang1}.md")
-            file2 = os.path.join(parasha_path, f"{lang2}.md")
-            if not (os.path.exists(file1) and os.path.exists(file2)):
-                continue
-
-            lang1_lines = remove_cssclasses(read_markdown_file(file1)).split("\n")
-            lang2_lines = remove_cssclasses(read_markdown_file(file2)).split("\n")
-
-            filename = remove_accents(parasha) + ".html"
-            table_rows = ""
-            chapter = verse = 0
-            commentaries = OrderedDict()
-            
-            for l1_line, l2_line in zip(lang1_lines, lang2_lines):
-                if lang2 == "HU":
-                    chapter, verse = extract_chapter_verse_hu(l2_line, chapter, verse)
-
-                if lang2 == "EN":
-                    chapter, verse = extract_chapter_verse_en(l2_line, chapter, verse)
-
-                l1_html = markdown_to_html(l1_line.strip()) if l1_line.strip() else "&nbsp;"
-                l2_html = markdown_to_html(l2_line.strip()) if l2_line.strip() else "&nbsp;"
-
-                current_verse = verse  # Save a local verse counter
-
-                # Define a replacement function that updates the verse each time
-                def replace_strong_with_link(match):
-                    nonlocal current_verse
-                    verse_id = f"ch{chapter}-vrs{current_verse}"
-                    text_inside = match.group(1)
-                    sefaria_book = SEFARIA_BOOK_MAP.get(book, None)
-                    if sefaria_book:
-                        #sefaria_link = f"https://www.sefaria.org/{sefaria_book}.{chapter}.{current_verse}?lang=bi&with=all&lang2=en"
-                        result = (
-                            f"<a id='{verse_id}' href='#{verse_id}' onclick=\"showSefariaLink({chapter}, {current_verse}, '{sefaria_book}')\">"
-                            f"<strong>{text_inside}</strong></a>"
-                        )
-                    else:
-                        result=f"<a id='{verse_id}' href='#{verse_id}'\"><strong>{text_inside}</strong></a>"
-                    current_verse += 1  # Increment after each replacement
-                    return result
-
-                # Apply replacement for l1 and l2
-                l1_html = re.sub(r"<strong>\{(.*?)\}</strong>", replace_strong_with_link, l1_html)
-                l2_html = re.sub(r"<strong>\{(.*?)\}</strong>", replace_strong_with_link, l2_html)
-
-                # Commentary links should be collected from lang2 (e.g., HU or EN)
-                for match in re.findall(r"highlightCommentary\('([^\']+)'\)", l2_html):
-                    if match not in commentaries:
-                        comment_path = os.path.join(parasha_path, "perusim", f"{match}.md")
-                        if os.path.exists(comment_path):
-                            comment_text = markdown_to_html(read_markdown_file(comment_path))
-                            #prefix = f"<a href='#ch{chapter}-vrs{current_verse}'><strong>{chapter}:{current_verse}</strong></a> "
-                            #commentaries[match] = prefix + comment_text
-                            commentaries[match] = comment_text
-
-                table_rows += f"<tr><td class='{lang1.lower()}'>{l1_html}</td><td class='{lang2.lower()} chapter-heading'>{l2_html}</td></tr>\n"
-
-            bilingual_table_html = f"""
-            <table class="bilingual-table">
-                <tbody>
-                    {table_rows}
-                </tbody>
-            </table>
-            """
-
-            commentary_html = "".join(
-                f'<div id="{cid}" class="commentary">{text}</div><hr>' for cid, text in commentaries.items()
-            )
-
-            with open("templates/parasha.html", "r", encoding="utf-8") as f:
-                page_template = f.read()
-
-            page_html = page_template.format(
-                title=parasha,
-                nav_structure=nav_html,
-                bilingual_content=bilingual_table_html,
-                commentary=commentary_html
-            )
-
-            with open(os.path.join(out_path, filename), "w", encoding="utf-8") as f:
-                f.write(page_html)
-
-    # Index page
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        index_template = f.read()
-    with open(os.path.join(out_path, "index.html"), "w", encoding="utf-8") as f:
-        f.write(index_template.format(nav_structure=nav_html))
-
-
-def generate_html():
-    """Generate Hebrew-English (root) and Hebrew-Hungarian (hu/) HTML sites."""
-    if os.path.exists(OUTPUT_PATH):
-        shutil.rmtree(OUTPUT_PATH)
+            linked, elsewhere = parasha_commentaries(book, parasha, commentary_indexes[parasha_path], unique)
+            pages = []
+            for lang1, lang2, output_subdir in sites:
+                file1 = os.path.join(parasha_path, f"{lang1}.md")
+                file2 = os.path.join(parasha_path, f"{lang2}.md")
+                if not (os.path.exists(file1) and os.path.exists(file2)):
+                    continue
+
+                page = os.path.join(output_subdir, parasha_filename(parasha))
+                out_file = os.path.join(OUTPUT_PATH, page)
+                inputs = page_inputs(context, file1, file2)
+
+                if elsewhere:
+                    # Links into other parashiyot change with the commentaries of the whole vault
+                    inputs["#links"] = text_hash(json.dumps(
+                        {cid: path and vault_key(path) for cid, path in elsewhere.items()},
+                        ensure_ascii=False, sort_keys=True))
+                if context.references is not None:
+                    # Backlinks also change when another parasha starts or stops citing these commentaries
+                    inputs["#backlinks"] = text_hash(json.dumps(
+                        page_backlinks(context.references, linked, lang1, lang2),
+                        ensure_ascii=False, sort_keys=True))
+
+                if page_is_current(manifest, page, out_file, inputs):
+                    new_manifest[page] = manifest[page]
+                    for key in chapter_pages.get(page, ()):
+                        new_manifest[key] = manifest[key]
+                    skipped += 1
+                    continue
+
+                pages.append((page, lang1, lang2, out_file, inputs))
+
+            if pages:
+                jobs.append((book, parasha, parasha_path, linked, context, pages))
+                rendered += len(pages)
+
+    for _, _, output_subdir in sites:
+        skipped += write_site_index(output_subdir, manifest, new_manifest, context)
+
+    return jobs, rendered, skipped
+
+def parasha_commentaries(book, parasha, commentary_index, unique):
+    """Resolve the commentary links of a parasha in every language (see resolve_links)."""
+    book_corpus = open_book(VAULT_PATH, book)
+    if parasha not in book_corpus.parashiyot:
+        return dict(commentary_index), {}
+    return resolve_links(commentary_index, book_corpus.link_ids(parasha, *book_corpus.manifest["languages"]), unique)
+
+def index_parasha(shard, parasha, parasha_path, commentary_index, sites, book_corpus):
+    """Add the verses of every language and the commentaries of a parasha to its book's search shard.
+
+    Verses come from the compiled corpus, numbered the way the pages anchor them: the
+    translation gives the chapter and first verse of a line, and each **{n}** marker
+    of the source is the next verse. Only the lines a page shows (both languages) count.
+    Commentaries are indexed for the sites whose page renders them, like render_parasha_page()
+    resolves them: linked from a shown translation line and found by parasha_commentaries().
+    """
+    page = parasha_filename(parasha)
+    indexed = set()
+    rendered = {}  # Commentary id → folders of the sites showing it
+    for lang1, lang2, output_subdir in sites:
+        if not book_corpus.has(parasha, lang1, lang2):
+            continue
+        shown = min(len(book_corpus.lines(parasha, lang1)), len(book_corpus.lines(parasha, lang2)))
+        for links in book_corpus.line_links(parasha, lang2)[:shown]:
+            for cid in links:
+                if cid in commentary_index and output_subdir not in rendered.setdefault(cid, []):
+                    rendered[cid].append(output_subdir)
 
-    generate_bilingual_html("HE", "EN", "")
-    generate_bilingual_html("HE", "HU", "hu")
-    copy_static_files()
-    print("✅ Bilingual sites generated.")
+        if lang1 in indexed and lang2 in indexed:
+            continue
+        by_line = [[] for _ in range(shown)]
+        for lang in (lang1, lang2):
+            if lang not in indexed:
+                for chapter, verse, line, text, _ in book_corpus.verses(parasha, lang):
+                    if line < shown:
+                        by_line[line].append(((chapter, verse), text))
+        for verses in by_line:
+            for anchor, text in verses:
+                shard.add(page, parasha, anchor, text)
+
+        indexed.update((lang1, lang2))
+
+    for cid in sorted(rendered):
+        shard.add(page, parasha, cid, cid + "\n" + read_markdown_file(commentary_index[cid][0]), sorted(rendered[cid]))
+
+def build_search_index(context, commentary_indexes=None, sites=None):
+    """Write the client-side search index: one shard per book, loaded on demand by static/script.js."""
+    if commentary_indexes is None:
+        commentary_indexes = {}
+    if sites is None:
+        sites = LANGUAGE_SITES
+    unique = scan_vault_commentaries(VAULT_PATH, context.books, commentary_indexes)
+    shards = []
+    for book, parashiyot in context.books.items():
+        shard = SearchShard(book)
+        book_corpus = open_book(VAULT_PATH, book)
+        for parasha in parashiyot:
+            parasha_path = os.path.join(VAULT_PATH, book, parasha)
+            if parasha.startswith(".") or not os.path.isdir(parasha_path):
+                continue
+            linked, _ = parasha_commentaries(book, parasha, commentary_indexes[parasha_path], unique)
+            index_parasha(shard, parasha, parasha_path, linked, sites, book_corpus)
+        if shard.docs:
+            shards.append((book_slug(book), shard))
+    write_search_index(OUTPUT_PATH, shards, context.precompress)
+
+def build_api(context, commentary_indexes=None):
+    """Write the static JSON API (see utils/api.py) from the compiled corpus, the commentaries and the verses citing them."""
+    if commentary_indexes is None:
+        commentary_indexes = {}
+    unique = scan_vault_commentaries(VAULT_PATH, context.books, commentary_indexes)
+    books = []
+    for book, parashiyot in context.books.items():
+        items = []
+        for parasha in parashiyot:
+            parasha_path = os.path.join(VAULT_PATH, book, parasha)
+            if parasha.startswith(".") or not os.path.isdir(parasha_path):
+                continue
+            linked, _ = parasha_commentaries(book, parasha, commentary_indexes[parasha_path], unique)
+            items.append((parasha, book_slug(parasha), linked))
+        books.append((book, book_slug(book), open_book(VAULT_PATH, book), items))
+    if context.references is None:
+        context.references = build_reference_index(VAULT_PATH, context.books, commentary_indexes)
+    write_api(OUTPUT_PATH, books, context.precompress, context.references)
+
+def write_site_index(output_subdir, manifest, new_manifest, context):
+    """Write a site's index page (and shared navigation script) if outdated. Returns the number of files skipped."""
+    out_path = os.path.join(OUTPUT_PATH, output_subdir)
+    skipped = 0
+
+    page = os.path.join(output_subdir, "index.html")
+    out_file = os.path.join(out_path, "index.html")
+    inputs = {"#nav": context.hashes["#nav"], "#template": context.hashes["#index-template"]}
+    if page_is_current(manifest, page, out_file, inputs):
+        skipped += 1
+    else:
+        write_output(out_file, context.templates["index"].format(nav_structure=context.nav_structure), context.precompress)
+    new_manifest[page] = inputs
+
+    if context.shared_nav:
+        page = os.path.join(output_subdir, "nav.js")
+        out_file = os.path.join(out_path, "nav.js")
+        inputs = {"#nav": context.hashes["#nav-script"]}
+        if not page_is_current(manifest, page, out_file, inputs):
+            write_output(out_file, context.nav_script(), context.precompress)
+        new_manifest[page] = inputs
+
+    return skipped
+
+def run_render_jobs(jobs, new_manifest, workers=1):
+    """Render the planned parashiyot, on a process pool when more than one worker is requested."""
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render_parasha, jobs))
+    else:
+        results = [render_parasha(job) for job in jobs]
+
+    for pages, stats in results:
+        new_manifest.update(pages)
+        if profiling.profiling():
+            # Summed over the workers, so these can exceed the render phase's wall time
+            profiling.add_phase("render: markdown (cpu)", stats["markdown"])
+            profiling.add_phase("render: pages (cpu)", sum(page["seconds"] for page in stats["pages"].values()))
+            profiling.record_pages(stats["pages"])
+            profiling.count("render_cache_hits", stats["render_cache_hits"])
+            profiling.count("render_cache_misses", stats["render_cache_misses"])
+            for page in stats["pages"].values():
+                for name in ("lines", "commentaries", "missing_commentaries"):
+                    profiling.count(name, page[name])
+
+def rebuild_parasha(context, book, parasha, manifest):
+    """Re-render one parasha's pages in every language site right away (used by the preview server).
+
+    Their new inputs are recorded in manifest. Returns the pages written.
+    """
+    parasha_path = os.path.join(VAULT_PATH, book, parasha)
+    compile_books(VAULT_PATH, {book: context.books[book]}, corpus_sites(LANGUAGE_SITES))
+    pages = []
+    for lang1, lang2, subdir in LANGUAGE_SITES:
+        file1 = os.path.join(parasha_path, f"{lang1}.md")
+        file2 = os.path.join(parasha_path, f"{lang2}.md")
+        if not (os.path.exists(file1) and os.path.exists(file2)):
+            continue
+        page = os.path.join(subdir, parasha_filename(parasha))
+        pages.append((page, lang1, lang2, os.path.join(OUTPUT_PATH, page), page_inputs(context, file1, file2)))
+    commentary_indexes = {}
+    unique = scan_vault_commentaries(VAULT_PATH, context.books, commentary_indexes)
+    linked, _ = parasha_commentaries(book, parasha, commentary_indexes[parasha_path], unique)
+    results, _ = render_parasha((book, parasha, parasha_path, linked, context, pages))
+    manifest.update(results)
+    return [page for page, *_ in pages]
+
+def generate_bilingual_html(lang1, lang2, output_subdir="", manifest=None, new_manifest=None, workers=1, context=None):
+    """Generate bilingual HTML pages for two languages and save them under the specified subdirectory.
+
+    When a previous build manifest is given, pages whose inputs are unchanged are left untouched.
+    The inputs of every page (rendered or skipped) are recorded in new_manifest.
+    """
+    if new_manifest is None:
+        new_manifest = {}
+    jobs, rendered, skipped = plan_pages(manifest or {}, new_manifest, context=context,
+                                         sites=((lang1, lang2, output_subdir),))
+    run_render_jobs(jobs, new_manifest, workers)
+    return rendered, skipped
+
+
+def generate_html(incremental=False, workers=1, shared_nav=False, optimize_assets=False, search=False,
+                  lazy_commentary=False, api=False, backlinks=False, split_chapters=False):
+    """Generate the bilingual HTML sites of LANGUAGE_SITES (by default Hebrew-English at the root and Hebrew-Hungarian in hu/).
+
+    With incremental=True the output folder is kept and only pages whose inputs
+    changed since the last build (according to the build manifest) are re-rendered.
+    All sites are planned in one walk over the vault and each parasha is rendered as one
+    job on `workers` processes, so the shared Hebrew text is parsed only once.
+    With shared_nav=True the navigation is served as a cached nav.js instead of inlined.
+    optimize_assets=True minifies and fingerprints the static assets and writes
+    precompressed .gz/.br siblings for all HTML, CSS and JS output.
+    search=True adds a search box backed by a prebuilt index sharded per book (see utils/search.py).
+    lazy_commentary=True keeps the commentaries out of the pages, in per-page JSON bundles loaded on first use.
+    api=True also exports the text and commentaries as a static JSON API, one file per chapter of each parasha (see utils/api.py).
+    backlinks=True ends every commentary with links to the verses citing it, across parashiyot.
+    split_chapters=True gives every chapter its own page (the first keeps the parasha's URL)
+    that prefetches its neighbours; deep links to the parasha page are redirected to the right chapter.
+    """
+    with profiling.phase("build: manifest"):
+        manifest = load_build_manifest() if incremental else {}
+        if os.path.exists(OUTPUT_PATH) and not incremental:
+            shutil.rmtree(OUTPUT_PATH)
+
+    # Fingerprinted asset names end up in the templates, so they're built first
+    asset_map = None
+    if optimize_assets:
+        with profiling.phase("build: static assets"):
+            asset_map = build_static_assets(STATIC_PATH, os.path.join(OUTPUT_PATH, "static"))
+    with profiling.phase("build: nav and templates"):
+        context = BuildContext(shared_nav, asset_map, precompress=optimize_assets, search=search,
+                               lazy_commentary=lazy_commentary, backlinks=backlinks,
+                               split_chapters=split_chapters)
+    new_manifest = {}
+    commentary_indexes = {}
+    with profiling.phase("build: plan"):
+        jobs, rendered, skipped = plan_pages(manifest, new_manifest, commentary_indexes, context)
+    with profiling.phase("build: render"):
+        run_render_jobs(jobs, new_manifest, workers)
+    profiling.count("pages_rendered", rendered)
+    profiling.count("pages_skipped", skipped)
+
+    with profiling.phase("build: commentary check"):
+        dangling, orphaned = find_broken_commentary_links(commentary_indexes, new_manifest, VAULT_PATH)
+    for key in dangling:
+        logger.warning("⚠ Link to missing commentary: %s", key)
+    for key in orphaned:
+        logger.warning("⚠ Commentary not linked from any page: %s", key)
+
+    # Remove pages whose parasha disappeared from the vault
+    for page in manifest:
+        if page not in new_manifest and os.path.exists(os.path.join(OUTPUT_PATH, page)):
+            remove_output(os.path.join(OUTPUT_PATH, page))
+            remove_output(commentary_bundle_path(os.path.join(OUTPUT_PATH, page)))
+            logger.info("🗑 Removed stale page: %s", page)
+
+    search_path = os.path.join(OUTPUT_PATH, SEARCH_DIR)
+    if search:
+        with profiling.phase("build: search index"):
+            build_search_index(context, commentary_indexes)
+    elif os.path.exists(search_path):
+        shutil.rmtree(search_path)
+
+    api_path = os.path.join(OUTPUT_PATH, API_DIR)
+    if api:
+        with profiling.phase("build: api"):
+            build_api(context, commentary_indexes)
+    elif os.path.exists(api_path):
+        shutil.rmtree(api_path)
+
+    with profiling.phase("build: static and manifest"):
+        if not optimize_assets:
+            copy_static_files(incremental)
+        save_build_manifest(new_manifest)
+    with profiling.phase("build: render cache"):
+        render_cache.prune()
+    logger.info("✅ Bilingual sites generated (%s pages rendered, %s unchanged).", rendered, skipped)
 
 
 